@@ -4,3 +4,5 @@ from pathlib import Path
 files_directory = Path(__file__).parent
 
 snapshot_dir = os.path.join(files_directory, "output", "snapshot_dir")
+
+snapshot_catalogue_path = os.path.join(snapshot_dir, "catalogue.sqlite3")
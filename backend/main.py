@@ -6,6 +6,8 @@ from backend.src.routes import upload_model_spec_route
 from backend.src.routes import upload_model_data_sheet_route
 
 from backend.src.routes import generate_model_route
+from backend.src.routes import jobs_route
+from backend.src.routes import run_model_route
 
 app = FastAPI()
 
@@ -33,6 +35,14 @@ app.include_router(generate_model_route.router,
                    prefix="/generate-model",
                    tags=["Generate"])
 
+app.include_router(run_model_route.router,
+                   prefix="/run-model",
+                   tags=["Run"])
+
+app.include_router(jobs_route.router,
+                   prefix="/jobs",
+                   tags=["Jobs"])
+
 
 # Mount your websocket router (no prefix so path is /ws/{client_id})
 app.include_router(ws_router)
@@ -61,4 +71,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-)
\ No newline at end of file
+)
+
+
+if __name__ == "__main__":
+    import os
+    import uvicorn
+
+    # Protocol-level websocket heartbeats: the server pings every interval and closes connections
+    # whose pong does not arrive within the timeout. Only applies when run this way; under
+    # `uvicorn backend.main:app` pass --ws-ping-interval / --ws-ping-timeout. The websocket
+    # endpoint has its own application-level heartbeat either way (see websocket_endpoint.py).
+    uvicorn.run(
+        app,
+        host=os.getenv("HOST", "127.0.0.1"),
+        port=int(os.getenv("PORT", "8000")),
+        ws_ping_interval=float(os.getenv("WS_PING_INTERVAL_S", "20")),
+        ws_ping_timeout=float(os.getenv("WS_PING_TIMEOUT_S", "20")),
+    )
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# off:        no caching (every call goes to the provider)
+# read_write: serve hits from the cache, store misses
+# record:     always call the provider, store every response (refreshes the cache)
+# replay:     serve only from the cache; a miss raises LLMCacheMiss (offline runs / benchmarks)
+CACHE_MODES = ("off", "read_write", "record", "replay")
+
+_DEFAULT_CACHE_DIR = os.path.join(Path(__file__).parent, "Cache")
+_DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class LLMCacheMiss(RuntimeError):
+    pass
+
+
+def request_key(model_id: str, request_body: str) -> str:
+    """
+    Content address for one request. request_body is the exact serialised body sent to the
+    provider (messages, temperature, max_tokens, ...), so any change to the history or settings
+    gives a new key.
+    """
+    return hashlib.sha256(f"{model_id}\n{request_body}".encode("utf-8")).hexdigest()
+
+
+def response_key(model_id: str, request_body: str, stop_after_tags: Optional[List[str]] = None) -> str:
+    """
+    Key under which a reply to request_body is stored. A reply cut short at stop_after_tags is
+    only a valid answer for requests that stop at the same tags, so the tags are part of the key.
+    Used by every backend that reads or writes recordings, so they stay interchangeable.
+    """
+    if stop_after_tags:
+        request_body = f"{request_body}\nstop_after_tags={','.join(stop_after_tags)}"
+    return request_key(model_id, request_body)
+
+
+class LLMResponseCache:
+
+    """
+    Persistent, size-bounded store of LLM responses keyed by request_key. One JSON file per
+    entry; when the store grows past max_bytes the least recently used entries are evicted.
+    Calls are made at temperature 0, so serving a stored response for an identical request is safe.
+    """
+
+    def __init__(self, mode: str = "off", cache_dir: str = _DEFAULT_CACHE_DIR, max_bytes: int = _DEFAULT_MAX_BYTES):
+        self._lock = threading.Lock()  # one lock for the cache's lifetime; guards the settings and byte count
+        self.mode, self.cache_dir, self.max_bytes = "off", cache_dir, max_bytes
+        self._total_bytes: Optional[int] = None  # lazily counted on first store
+        self.configure(mode=mode, cache_dir=cache_dir, max_bytes=max_bytes)
+
+    @classmethod
+    def from_env(cls) -> "LLMResponseCache":
+        return cls(
+            mode=os.getenv("LLM_CACHE_MODE", "off"),
+            cache_dir=os.getenv("LLM_CACHE_DIR", _DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(_DEFAULT_MAX_BYTES))),
+        )
+
+    def configure(self, *, mode: Optional[str] = None, cache_dir: Optional[str] = None,
+                  max_bytes: Optional[int] = None) -> None:
+        if mode is not None and mode not in CACHE_MODES:
+            raise ValueError(f"LLM cache mode must be one of {CACHE_MODES}")
+        with self._lock:
+            self.mode = mode if mode is not None else self.mode
+            if cache_dir is not None and cache_dir != self.cache_dir:
+                self.cache_dir = cache_dir
+                self._total_bytes = None
+            self.max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("read_write", "replay")
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in ("read_write", "record")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored entry for key, or None. In replay mode a miss raises LLMCacheMiss."""
+        if not self.reads:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+            return entry
+        except (FileNotFoundError, json.JSONDecodeError):
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No cached LLM response for request {key[:12]} (replay mode)")
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        if not self.writes:
+            return
+
+        cache_dir = self.cache_dir
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry).encode("utf-8")
+
+        # write then rename, so concurrent readers never see a partial entry
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+            if cache_dir != self.cache_dir:  # reconfigured mid-write: the entry landed in the old store
+                return
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_bytes()
+            else:
+                self._total_bytes += len(data) - old
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def _scan_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self) -> None:
+        # drop least recently used entries until we are back under 90% of the bound
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in sorted(self._entries(), key=lambda e: e[1]):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                os.remove(path)
+            self._total_bytes = 0
+
+
+llm_cache = LLMResponseCache.from_env()
@@ -0,0 +1,127 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Set, TypeVar
+
+T = TypeVar("T")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken:
+
+    """
+    Cancellation flag shared between a job's coroutine and the worker threads making its LLM calls.
+    LLM calls check it before sending, between streamed chunks and while waiting to retry.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._children: List["CancelToken"] = []
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._event.set()
+            children = list(self._children)
+        for child in children:
+            child.cancel()
+
+    def child(self) -> "CancelToken":
+        """
+        Token that is cancelled with this one but can also be cancelled on its own, e.g. to stop
+        a group of parallel calls once one of them has failed without cancelling the whole job.
+        """
+        token = CancelToken()
+        with self._lock:
+            self._children.append(token)
+            cancelled = self._event.is_set()
+        if cancelled:
+            token.cancel()
+        return token
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled("Job was cancelled")
+
+    def wait(self, seconds: float) -> None:
+        """Sleep for seconds, waking (and raising JobCancelled) as soon as the token is cancelled."""
+        if self._event.wait(seconds):
+            raise JobCancelled("Job was cancelled")
+
+
+# token of the job the current context belongs to (None outside jobs)
+current_cancel_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar(
+    "current_cancel_token", default=None
+)
+
+
+# futures of the blocking work (worker threads / processes) started by the current job, so a
+# cancelled job can wait for that work to actually stop (see JobManager._run); None outside jobs
+current_job_workers: contextvars.ContextVar[Optional[Set[Future]]] = contextvars.ContextVar(
+    "current_job_workers", default=None
+)
+
+
+def track_worker(future: Future) -> Future:
+    """Register future as work of the current job (until it is done). Returns future."""
+    workers = current_job_workers.get()
+    if workers is not None:
+        workers.add(future)
+        future.add_done_callback(workers.discard)
+    return future
+
+
+def check_cancelled() -> None:
+    token = current_cancel_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float) -> None:
+    """time.sleep that ends early (raising JobCancelled) if the current job is cancelled."""
+    token = current_cancel_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.wait(seconds)
+
+
+def run_all_or_cancel(calls: List[Callable[[], T]], *, max_workers: int) -> List[T]:
+    """
+    Run calls on a thread pool (at most max_workers at once), each in a copy of the caller's
+    context, and return their results in order.
+
+    The calls share a child of the current job's token: as soon as any call fails, that token
+    is cancelled (in-flight LLM calls stop at their next check), calls not yet started are
+    dropped and the error is raised, without waiting for the others.
+    """
+    job_token = current_cancel_token.get()
+    group_token = job_token.child() if job_token is not None else CancelToken()
+
+    def _in_group(call: Callable[[], T]) -> T:
+        current_cancel_token.set(group_token)
+        return call()
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [pool.submit(contextvars.copy_context().run, _in_group, call) for call in calls]
+        # surface the first failure as soon as it happens, whichever call it is
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for f in futures:
+            if f in done and f.exception() is not None:
+                f.result()
+        results = [f.result() for f in futures]
+    except BaseException:
+        group_token.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return results
@@ -1,5 +1,4 @@
-from typing import Any
-from backend.src.core.llm.llm_funcs import call_llm
+from typing import Any, Dict, Iterable, Optional
 import re
 
 def extract_between_tags(string: str, tag_name: str, no_match_response: Any) -> Any:
@@ -18,4 +17,43 @@ def extract_between_tags(string: str, tag_name: str, no_match_response: Any) ->
     return no_match_response
 
 
-
+class StreamingTagExtractor:
+
+    """
+    Incremental extract_between_tags for a streamed response. feed() each text delta as it arrives;
+    it returns the tags whose closing tag has just been seen (content extracted exactly as
+    extract_between_tags would from the text so far). Only the new text is searched on each feed.
+    """
+
+    def __init__(self, tag_names: Iterable[str]):
+        self.text = ""
+        self.blocks: Dict[str, str] = {}
+        self._pending = {tag: f"</{tag}>" for tag in tag_names}
+        self._scanned = 0
+        self._longest = max((len(c) for c in self._pending.values()), default=0)
+        self.end: Optional[int] = None  # index just past the last closing tag once all are complete
+
+    @property
+    def complete(self) -> bool:
+        return not self._pending
+
+    def feed(self, delta: str) -> Dict[str, str]:
+        self.text += delta
+        # a closing tag may straddle the previous delta
+        start = max(0, self._scanned - self._longest)
+        self._scanned = len(self.text)
+
+        found: Dict[str, str] = {}
+        for tag, closing in list(self._pending.items()):
+            pos = self.text.find(closing, start)
+            if pos == -1:
+                continue
+            content = extract_between_tags(self.text[:pos + len(closing)], tag, no_match_response=None)
+            if content is None:  # closing tag without an opening one; keep waiting
+                continue
+            found[tag] = content
+            del self._pending[tag]
+            self.end = max(self.end or 0, pos + len(closing))
+
+        self.blocks.update(found)
+        return found
@@ -0,0 +1,160 @@
+"""
+Local stand-in LLM backend, selected with llm="fake:<model id>". Needs no network or credentials,
+so the generation pipeline can be run end-to-end, load-tested and profiled offline.
+
+A reply is looked up, in order, from:
+  1. recordings: an LLM cache directory (see llm_cache) filled by running against Bedrock with
+     LLM_CACHE_MODE=record. <model id> must be the recorded Bedrock model id, as the request is
+     keyed exactly as the Bedrock backend keys it.
+  2. canned responses: [{"match": <regex on the latest prompt>, "response": <text>}, ...], first match wins
+  3. default_response
+otherwise the call fails.
+"""
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from backend.src.core.llm.llm_cache import LLMResponseCache, response_key
+from backend.src.core.llm.llm_cancel import cancellable_sleep
+from backend.src.core.llm.llm_extract import StreamingTagExtractor
+from backend.src.core.llm.llm_funcs import (
+    ChatHistoryType,
+    StreamOptions,
+    claude_request_body,
+    claude_user_content,
+    register_llm_backend,
+)
+from backend.src.core.llm.llm_stats import get_llm_stats
+
+MAX_TOKENS = 16000  # as sent by the Bedrock backend; part of the recording key
+STREAM_CHUNK_CHARS = 16  # size of the simulated deltas when streaming
+
+
+@dataclass
+class FakeLLMConfig:
+    recordings_dir: Optional[str] = None
+    canned: List[Dict[str, Any]] = field(default_factory=list)
+    default_response: Optional[str] = None
+    latency_s: float = 0.0                   # fixed delay per call
+    seconds_per_output_token: float = 0.0    # plus a delay proportional to the reply length
+    input_tokens: Optional[int] = None       # override reported usage (else recorded, else ~4 chars/token)
+    output_tokens: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        canned: List[Dict[str, Any]] = []
+        path = os.getenv("LLM_FAKE_RESPONSES")
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                canned = json.load(f)
+
+        def _opt_int(name):
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        return cls(
+            recordings_dir=os.getenv("LLM_FAKE_RECORDINGS"),
+            canned=canned,
+            default_response=os.getenv("LLM_FAKE_DEFAULT_RESPONSE"),
+            latency_s=float(os.getenv("LLM_FAKE_LATENCY_S", "0")),
+            seconds_per_output_token=float(os.getenv("LLM_FAKE_SECONDS_PER_OUTPUT_TOKEN", "0")),
+            input_tokens=_opt_int("LLM_FAKE_INPUT_TOKENS"),
+            output_tokens=_opt_int("LLM_FAKE_OUTPUT_TOKENS"),
+        )
+
+
+fake_llm_config = FakeLLMConfig.from_env()
+
+
+def configure_fake_llm(**settings: Any) -> FakeLLMConfig:
+    """Update the fake backend's settings in place (fields of FakeLLMConfig)."""
+    for name, value in settings.items():
+        if not hasattr(fake_llm_config, name):
+            raise ValueError(f"Unknown fake LLM setting: {name}")
+        setattr(fake_llm_config, name, value)
+    return fake_llm_config
+
+
+def _lookup(
+    model_id: str, body: str, prompt: str, stop_after_tags: Optional[List[str]] = None,
+) -> Tuple[str, Optional[Dict[str, int]]]:
+    cfg = fake_llm_config
+
+    if cfg.recordings_dir:
+        recordings = LLMResponseCache(mode="read_write", cache_dir=cfg.recordings_dir)
+        # same keys as the Bedrock backend writes; a full (non-stopped) reply also serves a
+        # stopping request, as _fake_stream cuts it at the tags
+        for tags in ([stop_after_tags, None] if stop_after_tags else [None]):
+            entry = recordings.get(response_key(model_id, body, tags))
+            if entry is not None:
+                return entry["output"], entry.get("usage")
+
+    for rule in cfg.canned:
+        if re.search(rule["match"], prompt, flags=re.DOTALL):
+            return rule["response"], None
+
+    if cfg.default_response is not None:
+        return cfg.default_response, None
+
+    raise RuntimeError(f"Fake LLM has no response for prompt: {prompt[:120]!r}")
+
+
+def _fake_stream(output: str, stream: StreamOptions) -> str:
+    """Replay output as deltas, stopping early at stream.stop_after_tags like the Bedrock backend."""
+    extractor = StreamingTagExtractor(stream.stop_after_tags)
+    for i in range(0, len(output), STREAM_CHUNK_CHARS):
+        delta = output[i:i + STREAM_CHUNK_CHARS]
+        if stream.on_text is not None:
+            stream.on_text(delta)
+        extractor.feed(delta)
+        if stream.stop_after_tags and extractor.complete:
+            return extractor.text[:extractor.end]
+    return output
+
+
+def _call_llm_fake(
+    model_id: str,
+    prompt: str,
+    image_b64s: List[str],
+    image_titles: List[str],
+    injection: Optional[str],
+    chat_history: ChatHistoryType,
+    max_retries: int,
+    stream: Optional[StreamOptions] = None,
+) -> Tuple[str, ChatHistoryType]:
+
+    start = time.time()
+    cfg = fake_llm_config
+
+    chat_history.append({"role": "user", "content": claude_user_content(prompt, image_b64s, image_titles, injection)})
+    body = claude_request_body(chat_history, MAX_TOKENS)
+
+    output, usage = _lookup(model_id, body, prompt, stream.stop_after_tags if stream else None)
+    usage = usage or {}
+
+    full_len = len(output)
+    if stream is not None:
+        output = _fake_stream(output, stream)
+
+    recorded_out = usage.get("output_tokens")
+    if recorded_out and full_len and len(output) < full_len:  # stopped early: scale the recorded count
+        recorded_out = max(1, round(recorded_out * len(output) / full_len))
+
+    usage = {
+        "input_tokens": cfg.input_tokens or usage.get("input_tokens") or len(body) // 4,
+        "output_tokens": cfg.output_tokens or recorded_out or len(output) // 4,
+    }
+
+    cancellable_sleep(cfg.latency_s + cfg.seconds_per_output_token * usage["output_tokens"])
+
+    chat_history.append({"role": "assistant", "content": output})
+    get_llm_stats().update(response={"usage": usage}, model=f"fake:{model_id}", latency_s=time.time() - start)
+
+    print(f"Finished fake call in {round(time.time() - start, 2)} seconds")
+
+    return output, chat_history
+
+
+register_llm_backend("fake:", _call_llm_fake)
@@ -6,15 +6,24 @@ Created on Thu Oct 24 10:57:27 2024
 @author: will.rawlinson
 """
 
+import asyncio
 import base64
+import contextvars
+import functools
 import os
 import time
-from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
 from dotenv import load_dotenv
 import boto3
 import logging
 from backend.src.core.llm.llm_log import llm_log
-from  backend.src.core.llm.llm_stats import llm_stats
+from  backend.src.core.llm.llm_stats import get_llm_stats, llm_stats
+from backend.src.core.llm.llm_cache import llm_cache, response_key
+from backend.src.core.llm.llm_cancel import cancellable_sleep, check_cancelled, current_cancel_token, track_worker
+from backend.src.core.llm.llm_extract import StreamingTagExtractor
+from backend.src.core.llm.llm_retry import RetryPolicy, bedrock_rate_limiter, call_with_retry
 import json
 from botocore.config import Config
 
@@ -58,6 +67,23 @@ ChatHistoryEntry = Dict[str, Union[str, MessageContent]]
 ChatHistoryType = List[ChatHistoryEntry]
 
 
+@dataclass
+class StreamOptions:
+    """
+    on_text(delta) receives partial output as it is generated (may be None).
+    stop_after_tags: stop generating once all these tagged blocks are complete.
+    """
+    on_text: Optional[Callable[[str], None]] = None
+    stop_after_tags: List[str] = field(default_factory=list)
+
+
+# Set by whoever wants partial LLM output for the calls made in the current context (e.g. a
+# generation job forwarding progress to the websocket). Setting it turns streaming on.
+llm_stream_handler: contextvars.ContextVar[Optional[Callable[[str], None]]] = contextvars.ContextVar(
+    "llm_stream_handler", default=None
+)
+
+
 def call_llm(
     prompt: str,
     image_b64s: List[str],
@@ -66,6 +92,7 @@ def call_llm(
     prompt_injections=None,
     prompt_index=None,
     max_retries: int = 10,
+    stop_after_tags: Optional[List[str]] = None,
 ) -> Tuple[str, ChatHistoryType]:
     """
     Submit prompts, chat history, images to LLM. Get back LLMs response and updated
@@ -81,9 +108,14 @@ def call_llm(
     :param max_retries: how many retries if we hit some error
     :prompt_injections: optional injections from a feedback loop into a workflow
     :prompt_index: for feedback loop injection, need to know what index in the workflow we are on
+    :param stop_after_tags: when streaming, stop generating as soon as all these <tag>...</tag> blocks
+    are complete (the reply is cut just after the last closing tag)
     :return: LLM output (string), chat history now including the prompt / output generated by this cal
     """
 
+    # the job this call belongs to may have been cancelled
+    check_cancelled()
+
     # feedback loop injections
     injection = None
 
@@ -106,33 +138,72 @@ def call_llm(
     if chat_history is None:
         chat_history = []
 
-    if llm.startswith("bedrock:"):
-        model_id = llm[8:]
-        if model_id.startswith("anthropic.claude") or model_id.startswith("eu.anthropic.claude") or model_id.startswith("us.anthropic.claude"):
-
-
-
-            return _call_llm_bedrock_claude(
-                model_id,
+    # stream when someone is listening for partial output (llm_stream_handler) or LLM_STREAM=1
+    on_text = llm_stream_handler.get()
+    stream = None
+    if on_text is not None or os.getenv("LLM_STREAM") == "1":
+        stream = StreamOptions(on_text=on_text, stop_after_tags=list(stop_after_tags or []))
+
+    model = os.getenv("llm") or ""
+    for prefix, backend in LLM_BACKENDS.items():
+        if model.startswith(prefix):
+            return backend(
+                model[len(prefix):],
                 prompt,
                 image_b64s,
                 image_titles,
                 injection,
                 chat_history,
                 max_retries,
+                stream=stream,
             )
-        raise RuntimeError("Unsupported bedrock model: {}".format(model_id))
 
-    raise RuntimeError("Unsupported model: {}".format(llm))
+    raise RuntimeError("Unsupported model: {}".format(model))
+
+
+# An LLM backend takes (model_id, prompt, image_b64s, image_titles, injection, chat_history, max_retries,
+# stream=StreamOptions or None), appends the user turn and the reply to chat_history, and returns
+# (output, chat_history). call_llm picks the backend whose prefix matches the configured "llm"
+# (e.g. "bedrock:<model id>").
+LLMBackend = Callable[..., Tuple[str, ChatHistoryType]]
+
+LLM_BACKENDS: Dict[str, LLMBackend] = {}
+
+
+def register_llm_backend(prefix: str, backend: LLMBackend) -> None:
+    """Register a backend for models named "<prefix><model id>" (prefix including the colon)."""
+    LLM_BACKENDS[prefix] = backend
+
+
+def _call_llm_bedrock(model_id, prompt, image_b64s, image_titles, injection, chat_history, max_retries, stream=None):
+    if model_id.startswith("anthropic.claude") or model_id.startswith("eu.anthropic.claude") or model_id.startswith("us.anthropic.claude"):
+        return _call_llm_bedrock_claude(
+            model_id,
+            prompt,
+            image_b64s,
+            image_titles,
+            injection,
+            chat_history,
+            max_retries,
+            stream=stream,
+        )
+    raise RuntimeError("Unsupported bedrock model: {}".format(model_id))
+
+
+register_llm_backend("bedrock:", _call_llm_bedrock)
+
 
 _CLIENTS = {}
 
 def boto3_client(
     service_name: str,
-    profile_name: str = os.environ["AWS_PROFILE"],
-    region_name: str = os.environ["AWS_REGION"],
+    profile_name: Optional[str] = None,
+    region_name: Optional[str] = None,
 ) -> boto3.client:
     """Get boto3 client for some service, picking up profile/region from env vars."""
+    # read at call time, so importing this module does not need AWS settings
+    profile_name = profile_name or os.environ["AWS_PROFILE"]
+    region_name = region_name or os.environ["AWS_REGION"]
     key = (service_name, profile_name, region_name)
 
     config = Config(
@@ -165,19 +236,13 @@ def boto3_client(
     return _CLIENTS[key]
 
 
-def _call_llm_bedrock_claude(
-    model_id: str,
+def claude_user_content(
     prompt: str,
     image_b64s: List[str],
     image_titles: List[str],
     injection: Optional[str],
-    chat_history: ChatHistoryType,
-    max_retries: int,
-) -> Tuple[str, ChatHistoryType]:
-
-    start = time.time()
-
-    print(f"Calling MODEL ID: {model_id}")
+) -> MessageContent:
+    """User turn in the Anthropic Claude Messages format (text, then titled images)."""
 
     if injection:  # Add the injection
         prompt += (
@@ -200,53 +265,168 @@ def _call_llm_bedrock_claude(
                 },
             }
         )
+    return current_message
+
+
+def claude_request_body(chat_history: ChatHistoryType, max_tokens: int) -> str:
+    """
+    Serialised invoke_model body. Also the content the LLM cache is keyed on, so any backend that
+    replays recorded Bedrock responses must build it the same way.
+    """
+    return json.dumps({"anthropic_version": "bedrock-2023-05-31",
+                       "max_tokens": max_tokens,
+                       "messages": chat_history,
+                       "temperature": 0
+    })
+
+
+def _call_llm_bedrock_claude(
+    model_id: str,
+    prompt: str,
+    image_b64s: List[str],
+    image_titles: List[str],
+    injection: Optional[str],
+    chat_history: ChatHistoryType,
+    max_retries: int,
+    stream: Optional[StreamOptions] = None,
+) -> Tuple[str, ChatHistoryType]:
+
+    start = time.time()
+
+    print(f"Calling MODEL ID: {model_id}")
 
     # add the current message to chat history
     # all messages must have a role and content, so we add a message with the role 'user' and
     # content equal to current message
 
-    chat_history.append({"role": "user", "content": current_message})
+    chat_history.append({"role": "user", "content": claude_user_content(prompt, image_b64s, image_titles, injection)})
 
     max_tokens = 16000
 
-    # to invoke models, we use bedrock runtime
-    client = boto3_client(service_name="bedrock-runtime")
-
     # We must create a string (default) body for the invoke model method
     # Requirements can be found at:
     # DOCS.AWS.AMAZON.COM/BEDROCK/LATEST/USERGUIDE/MODEL-PARAMETERS-ANTHROPIC-CLAUDE-MESSAGES-REQUEST-RESPONSE.HTML
 
-    body = json.dumps({"anthropic_version": "bedrock-2023-05-31",
-                       "max_tokens": max_tokens,
-                       "messages": chat_history,
-                       "temperature": 0
-    })
+    body = claude_request_body(chat_history, max_tokens)
+
+    # identical request seen before (temperature 0) -> reuse the stored response
+    cache_key = response_key(model_id, body, stream.stop_after_tags if stream else None)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        output = cached["output"]
+        chat_history.append({"role": "assistant", "content": output})
+        get_llm_stats().record_cache_hit()
+        print(f"Served call from LLM cache in {round(time.time() - start, 2)} seconds")
+        return output, chat_history
+
+    # to invoke models, we use bedrock runtime
+    client = boto3_client(service_name="bedrock-runtime")
 
     # Make the request to Bedrock
 
-    for attempt in range(max_retries):
-        try:
-            response = client.invoke_model(body=body, modelId=model_id)
+    def _invoke():
+        response = client.invoke_model(body=body, modelId=model_id)
 
-            # Process the response, which contains a StreamingBody object which needs to be read
-            # before parsing
-            body = json.loads(response.get("body").read().decode("utf-8"))
+        # Process the response, which contains a StreamingBody object which needs to be read
+        # before parsing
+        response_body = json.loads(response.get("body").read().decode("utf-8"))
+        return response_body, response_body["content"][0]["text"]
 
-            output = body["content"][0]["text"]
+    invoke = _invoke if stream is None else functools.partial(
+        _invoke_bedrock_claude_stream, client, model_id, body, stream
+    )
 
-            # append LLM output to chat history
-            chat_history.append({"role": "assistant", "content": output})
-            llm_stats.update(response=body, model=llm)
+    def _on_retry(attempt, error_class, e, delay):
+        get_llm_stats().record_retry(error_class)
+        print(f"Attempt {attempt} failed ({error_class}): {e}. Retrying in {round(delay, 1)} seconds")
+
+    # throttling / timeouts / server errors back off exponentially (with jitter); validation and
+    # other client errors fail straight away
+    response_body, output = call_with_retry(
+        invoke,
+        policy=RetryPolicy(max_attempts=max_retries),
+        limiter=bedrock_rate_limiter,
+        on_retry=_on_retry,
+        sleep=cancellable_sleep,
+    )
 
-            print(f"Finished call in {round(time.time() - start, 2)} seconds")
+    # append LLM output to chat history
+    chat_history.append({"role": "assistant", "content": output})
+    get_llm_stats().update(response=response_body, model=f"bedrock:{model_id}", latency_s=time.time() - start)
+    llm_cache.put(cache_key, {"model_id": model_id, "output": output, "usage": response_body.get("usage")})
 
-            return output, chat_history
+    print(f"Finished call in {round(time.time() - start, 2)} seconds")
 
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed: {e}")
-            time.sleep(15)  # for rate limits
+    return output, chat_history
 
-    raise RuntimeError("API failed after retries.")
+
+def _invoke_bedrock_claude_stream(client, model_id: str, body: str, stream: StreamOptions):
+    """
+    invoke_model_with_response_stream, forwarding text deltas to stream.on_text. Once every tag in
+    stream.stop_after_tags has closed, the stream is closed (generation stops) and the reply is
+    cut just after the last closing tag. Returns (response_body, output) like the non-streaming call.
+    """
+    response = client.invoke_model_with_response_stream(body=body, modelId=model_id)
+    events = response.get("body")
+
+    extractor = StreamingTagExtractor(stream.stop_after_tags)
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    stopped_early = False
+
+    token = current_cancel_token.get()
+
+    for event in events:
+        if token is not None and token.cancelled:
+            events.close()
+            token.raise_if_cancelled()
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+        data = json.loads(chunk["bytes"].decode("utf-8"))
+
+        if data["type"] == "message_start":
+            usage["input_tokens"] = data["message"]["usage"].get("input_tokens", 0)
+        elif data["type"] == "message_delta":
+            usage["output_tokens"] = data.get("usage", {}).get("output_tokens", usage["output_tokens"])
+        elif data["type"] == "content_block_delta" and data["delta"].get("type") == "text_delta":
+            delta = data["delta"]["text"]
+            if stream.on_text is not None:
+                stream.on_text(delta)
+            extractor.feed(delta)
+            if stream.stop_after_tags and extractor.complete:
+                stopped_early = True
+                break
+
+    output = extractor.text
+    if stopped_early:
+        events.close()
+        output = output[:extractor.end]
+        # no final usage event; approximate what was generated
+        usage["output_tokens"] = usage["output_tokens"] or len(output) // 4
+
+    return {"content": [{"type": "text", "text": output}], "usage": usage}, output
+
+
+# Blocking LLM work (boto3 calls, retry sleeps, whole generation workflows) is run here so that it never
+# holds the asyncio event loop. Sized separately from the loop's default executor so that several
+# generation jobs can wait on Bedrock at once without starving other to_thread users.
+_LLM_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_MAX_WORKERS", "16")),
+    thread_name_prefix="llm",
+)
+
+T = TypeVar("T")
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Await a synchronous (LLM-bound) callable on the LLM executor. The caller's contextvars are
+    carried into the worker thread, as with asyncio.to_thread. The worker is tracked on the
+    current job (llm_cancel.track_worker), so a cancelled job waits for the thread to stop.
+    """
+    ctx = contextvars.copy_context()
+    future = track_worker(_LLM_EXECUTOR.submit(ctx.run, fn, *args, **kwargs))
+    return await asyncio.wrap_future(future)
 
 
 def add_user_message_to_history(chat_history, message):
@@ -263,6 +443,10 @@ def add_response_to_history(chat_history, response):
 
     return chat_history
 
+# local stand-in backend ("fake:"), registers itself
+import backend.src.core.llm.llm_fake  # noqa: E402,F401
+
+
 def main():
 
     llm_stats.reset()
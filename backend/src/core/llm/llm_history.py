@@ -0,0 +1,69 @@
+from typing import List
+from backend.src.core.llm.llm_funcs import ChatHistoryType
+
+# full:    keep every turn (each call resends everything before it)
+# summary: remove a finished unit of work (e.g. one event's concept/build/metadata turns) and carry
+#          a one-line note about it into the next real prompt (see completed_work_note)
+# drop:    remove finished units entirely, keeping only the shared preamble
+HISTORY_MODES = ("full", "summary", "drop")
+
+
+def check_history_mode(mode: str) -> None:
+    if mode not in HISTORY_MODES:
+        raise ValueError(f"history_mode must be one of {HISTORY_MODES}")
+
+
+def compact_turns(history: ChatHistoryType, start: int, mode: str) -> ChatHistoryType:
+    """
+    Compact the finished turns history[start:] according to mode. Returns a new list; the
+    messages before start (the shared preamble) are kept as they are, so a prompt-cache
+    breakpoint in the preamble stays valid. No turns are invented: in "summary" mode the caller
+    passes the summaries on with completed_work_note.
+    """
+    check_history_mode(mode)
+    if mode == "full":
+        return history
+    return list(history[:start])
+
+
+def summarise_event(event_name: str, additional_parameters: List[dict]) -> str:
+    """Short stand-in for an event's concept/build/metadata turns."""
+    names = [p.get("parameter_name") for p in additional_parameters if p.get("parameter_name")]
+    added = ", ".join(names) if names else "none"
+    return (
+        f"Event '{event_name}' is complete: its final code and metadata have been recorded. "
+        f"Additional parameters introduced: {added}."
+    )
+
+
+def completed_work_note(summaries: List[str]) -> str:
+    """
+    Clearly labelled system note listing work whose turns were removed from the conversation, to
+    prefix to the next user prompt. Empty string when there is nothing to report.
+    """
+    if not summaries:
+        return ""
+    lines = "\n".join(f"- {s}" for s in summaries)
+    return (
+        "[System note: the turns for the following completed work were removed from this "
+        f"conversation to save space.]\n{lines}\n\n"
+    )
+
+
+def mark_prompt_cache(history: ChatHistoryType) -> ChatHistoryType:
+    """
+    Put a provider prompt-cache breakpoint (Anthropic "cache_control") on the last message of
+    history, so the provider can reuse the processed prefix on later calls that resend it.
+    Call once the stable preamble is complete; string content is converted to a text block.
+    Modifies history in place and returns it.
+    """
+    if not history:
+        return history
+
+    last = history[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+        last["content"] = content
+    content[-1]["cache_control"] = {"type": "ephemeral"}
+    return history
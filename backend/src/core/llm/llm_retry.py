@@ -0,0 +1,179 @@
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    HTTPClientError,
+    IncompleteReadError,
+    ReadTimeoutError,
+    ResponseStreamingError,
+)
+from backend.src.core.llm.llm_cancel import JobCancelled, current_cancel_token
+
+T = TypeVar("T")
+
+# error classes
+THROTTLE = "throttle"   # provider is rate limiting us: back off harder
+TIMEOUT = "timeout"     # connection / read timeouts
+SERVER = "server"       # provider-side failure (5xx, model not ready)
+CLIENT = "client"       # our request or setup is wrong (validation, auth, missing credentials,
+                        # unknown model) or any unrecognised error: never retried
+UNKNOWN = "unknown"     # a malformed or truncated response body: retried
+
+RETRYABLE = (THROTTLE, TIMEOUT, SERVER, UNKNOWN)
+
+_THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+_TIMEOUT_CODES = {"ModelTimeoutException", "RequestTimeout", "RequestTimeoutException"}
+_SERVER_CODES = {"InternalServerException", "ServiceUnavailableException", "ModelNotReadyException",
+                 "ModelErrorException"}
+
+
+def classify_error(e: BaseException) -> str:
+    """
+    Error class of e. Only errors known to be transient are retryable; anything unrecognised
+    (e.g. NoCredentialsError, ParamValidationError, or a bug on our side) is CLIENT.
+    """
+    if isinstance(e, (ReadTimeoutError, ConnectTimeoutError, TimeoutError)):
+        return TIMEOUT
+    if isinstance(e, (EndpointConnectionError, ConnectionClosedError, HTTPClientError,
+                      IncompleteReadError, ResponseStreamingError, ConnectionError)):
+        return SERVER
+    if isinstance(e, ClientError):
+        err = e.response.get("Error", {})
+        code = err.get("Code", "")
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        if code in _THROTTLE_CODES or status == 429:
+            return THROTTLE
+        if code in _TIMEOUT_CODES or status == 408:
+            return TIMEOUT
+        if code in _SERVER_CODES or status >= 500:
+            return SERVER
+        return CLIENT
+    if isinstance(e, BotoCoreError):  # credentials, parameter validation, region, ...
+        return CLIENT
+    if isinstance(e, (ValueError, KeyError)):  # response body we could not parse
+        return UNKNOWN
+    return CLIENT
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: before retry n (0-based) wait uniform(0, min(max_delay,
+    base_delay * 2**n)), with throttling using throttle_base_delay. Gives up after max_attempts
+    calls or once deadline_s has passed since the first attempt, whichever comes first.
+    """
+    max_attempts: int = 10
+    base_delay: float = 1.0
+    throttle_base_delay: float = 4.0
+    max_delay: float = 60.0
+    deadline_s: float = 600.0
+
+    def backoff(self, retry: int, error_class: str) -> float:
+        base = self.throttle_base_delay if error_class == THROTTLE else self.base_delay
+        return random.uniform(0.0, min(self.max_delay, base * (2 ** retry)))
+
+
+class TokenBucket:
+
+    """
+    Thread-safe token bucket shared by every caller in the process (all concurrent jobs).
+    rate: tokens added per second; capacity: burst size. rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Block until tokens are available; False if that would take longer than timeout. Raises
+        JobCancelled if the calling job (current_cancel_token) is cancelled while waiting.
+        """
+        if self.rate <= 0:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            # wake (raising JobCancelled) as soon as the calling job is cancelled
+            token = current_cancel_token.get()
+            if token is None:
+                time.sleep(wait)
+            else:
+                token.wait(wait)
+
+
+# LLM_RATE_LIMIT_RPS: requests per second across all jobs (unset / 0 = unlimited)
+bedrock_rate_limiter = TokenBucket(
+    rate=float(os.getenv("LLM_RATE_LIMIT_RPS", "0")),
+    capacity=float(os.getenv("LLM_RATE_LIMIT_BURST")) if os.getenv("LLM_RATE_LIMIT_BURST") else None,
+)
+
+
+class RetriesExhausted(RuntimeError):
+    pass
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    *,
+    policy: RetryPolicy,
+    limiter: Optional[TokenBucket] = None,
+    on_retry: Optional[Callable[[int, str, BaseException, float], None]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    Call fn until it succeeds, retrying retryable errors under policy. Client errors are raised
+    straight away. Each attempt first takes a token from limiter (if any).
+
+    on_retry(attempt, error_class, error, delay) is called before each wait.
+    """
+    start = time.monotonic()
+    attempt = 0
+
+    while True:
+        attempt += 1
+        remaining = policy.deadline_s - (time.monotonic() - start)
+        if limiter is not None and not limiter.acquire(timeout=max(0.0, remaining)):
+            raise RetriesExhausted(f"Rate limiter wait exceeded the {policy.deadline_s}s deadline")
+
+        try:
+            return fn()
+        except JobCancelled:
+            raise
+        except Exception as e:
+            error_class = classify_error(e)
+            if error_class not in RETRYABLE:
+                raise
+
+            delay = policy.backoff(attempt - 1, error_class)
+            elapsed = time.monotonic() - start
+            if attempt >= policy.max_attempts or elapsed + delay > policy.deadline_s:
+                raise RetriesExhausted(
+                    f"API failed after {attempt} attempts in {round(elapsed, 1)}s ({error_class}): {e}"
+                ) from e
+
+            if on_retry is not None:
+                on_retry(attempt, error_class, e, delay)
+            sleep(delay)
@@ -1,10 +1,22 @@
+import contextvars
+import threading
+from typing import Any, Dict, Optional
+
+# upper bounds (seconds) of the per-step call latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_S = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+
+
 class LLMStats:
 
     """
-    Class to track LLM stats (token usage, cost etc.) across the workflow
+    Class to track LLM stats (token usage, cost etc.) across the workflow.
+    Thread-safe: calls made concurrently for one job update the same instance. Models missing from
+    the price table are still counted (at no cost, and listed as unpriced).
+    Per pipeline step (see set_llm_step) it also keeps a call latency histogram, cache hits and retries.
     """
 
     def __init__(self):
+        self._lock = threading.Lock()
         self.output_tokens = {
             "gpt-4o-2024-11-20": 0,
             "gpt-4-turbo-2024-04-09": 0,
@@ -23,12 +35,23 @@ class LLMStats:
             'bedrock:us.anthropic.claude-3-5-sonnet-20240620-v1:0':0,
         }
         self.input_tokens = {key: 0 for key in self.output_tokens}
+        self._priced_models = set(self.output_tokens)  # models added later by _track have no price
         self.number_calls = {key: 0 for key in self.output_tokens}
         self.total_cost = 0.00
+        self.cache_hits: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}  # by error class
+        self.latency: Dict[str, Dict[str, Any]] = {}  # by step
 
-    def update(self, response, model):
+    def _track(self, model):
+        if model not in self.number_calls:
+            self.output_tokens[model] = 0
+            self.input_tokens[model] = 0
+            self.number_calls[model] = 0
 
-        if model in self.number_calls:
+    def update(self, response, model, latency_s: Optional[float] = None, step: Optional[str] = None):
+
+        with self._lock:
+            self._track(model)
             self.number_calls[model] += 1
             # Handle OpenAI models
             if model.startswith('gpt') or model.startswith('o'):
@@ -38,11 +61,31 @@ class LLMStats:
             elif model.startswith('claude'):
                 self.output_tokens[model] += response.usage.output_tokens
                 self.input_tokens[model] += response.usage.input_tokens
-            elif model.startswith('bedrock'):
-                self.output_tokens[model] += response["usage"]["output_tokens"]
-                self.input_tokens[model] += response["usage"]["input_tokens"]
+            # Bedrock and other prefixed backends report Anthropic-style usage dicts
+            elif isinstance(response, dict) and response.get("usage"):
+                self.output_tokens[model] += response["usage"].get("output_tokens", 0)
+                self.input_tokens[model] += response["usage"].get("input_tokens", 0)
+
+            if latency_s is not None:
+                self._record_latency(step or current_llm_step.get(), latency_s)
 
-        # TODO update how this all works with the prefix
+    def _record_latency(self, step: str, latency_s: float):
+        h = self.latency.setdefault(
+            step, {"count": 0, "total_s": 0.0, "max_s": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS_S) + 1)}
+        )
+        h["count"] += 1
+        h["total_s"] += latency_s
+        h["max_s"] = max(h["max_s"], latency_s)
+        h["buckets"][sum(1 for b in LATENCY_BUCKETS_S if latency_s > b)] += 1
+
+    def record_cache_hit(self, step: Optional[str] = None):
+        with self._lock:
+            step = step or current_llm_step.get()
+            self.cache_hits[step] = self.cache_hits.get(step, 0) + 1
+
+    def record_retry(self, error_class: str):
+        with self._lock:
+            self.retries[error_class] = self.retries.get(error_class, 0) + 1
 
     def get_total_cost(self):
         cost_per_token = {
@@ -68,6 +111,9 @@ class LLMStats:
             total_cost += self.input_tokens[model] * costs["input"]
         return total_cost
 
+    def get_unpriced_models(self):
+        return [m for m in self.number_calls if self.number_calls[m] and m not in self._priced_models]
+
     def get_output_tokens(self):
         result = "; ".join(
             f"{model}: {tokens:,}" for model, tokens in self.output_tokens.items() if tokens > 0
@@ -91,12 +137,58 @@ class LLMStats:
         output_tokens = self.get_output_tokens()
         input_tokens = self.get_input_tokens()
         number_calls = self.get_number_calls()
+        unpriced = self.get_unpriced_models()
         return (f"""Calls made - {number_calls}.
-Total cost -    ${total_cost}.
+Total cost -    ${total_cost}{f" (excludes unpriced models: {', '.join(unpriced)})" if unpriced else ""}.
 Input tokens -    {input_tokens}.
-Output tokens -    {output_tokens}.""")
+Output tokens -    {output_tokens}.
+Cache hits -    {sum(self.cache_hits.values())}.
+Retries -    {sum(self.retries.values())}.""")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready summary (job API, saved snapshots)."""
+        with self._lock:
+            used = [m for m, n in self.number_calls.items() if n]
+            return {
+                "total_cost": self.get_total_cost(),
+                "unpriced_models": self.get_unpriced_models(),
+                "models": {
+                    m: {
+                        "calls": self.number_calls[m],
+                        "input_tokens": self.input_tokens[m],
+                        "output_tokens": self.output_tokens[m],
+                    }
+                    for m in used
+                },
+                "cache_hits": dict(self.cache_hits),
+                "retries": dict(self.retries),
+                "latency_buckets_s": list(LATENCY_BUCKETS_S),
+                "latency_by_step": {step: {**h, "buckets": list(h["buckets"])} for step, h in self.latency.items()},
+            }
 
     def reset(self):
         self.__init__()
 
+
+# pipeline step the current context's calls are attributed to (latency histogram / cache hits)
+current_llm_step: contextvars.ContextVar[str] = contextvars.ContextVar("current_llm_step", default="unscoped")
+
+# stats of the job the current context belongs to; see get_llm_stats
+_context_llm_stats: contextvars.ContextVar[Optional[LLMStats]] = contextvars.ContextVar("llm_stats", default=None)
+
+
+def set_llm_step(step: str) -> None:
+    current_llm_step.set(step)
+
+
+def use_llm_stats(stats: LLMStats) -> LLMStats:
+    """Make stats the accumulator for LLM calls made in the current context (and threads it spawns via run_blocking)."""
+    _context_llm_stats.set(stats)
+    return stats
+
+
+def get_llm_stats() -> LLMStats:
+    """The current context's accumulator (a job's own), else the process-wide llm_stats."""
+    return _context_llm_stats.get() or llm_stats
+
 llm_stats = LLMStats()
\ No newline at end of file
@@ -9,11 +9,11 @@ def load_model_bundle_snapshot(snapshot_dir: str) -> Dict[str, Any]:
 
     transition_matrix_data = {}
     transition_code = (base / snap["code"]["transition_matrix_data"]["path"]).read_text(encoding="utf-8")
-    transition_matrix_data["code"] = transition_code
-    transition_matrix_data["metadata"] = snap["code"]["transition_matrix_data"]["metadata"].read_text(encoding="utf-8")
+    transition_matrix_data["final_code"] = transition_code
+    transition_matrix_data["metadata"] = snap["code"]["transition_matrix_data"]["metadata"]
 
     event_data: List[Dict[str, Any]] = []
-    for e in snap["code"]["events"]:
+    for e in snap["code"]["event_data"]:
         metadata = e.get("metadata", {})
 
         # 🔑 enabled defaults to True if missing
@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timezone
 from backend.files.file_paths import snapshot_dir as SNAPSHOT_ROOT
+from backend.src.file_management.snapshot_catalogue import catalogue, index_snapshot
 import shutil
 
 WORKING_DIRNAME = "_working"
@@ -34,6 +35,8 @@ def save_model_bundle_snapshot(
       snapshot.json
       code/transition_matrix.py
       code/events/*.py
+    then adds it to the snapshot catalogue. If indexing fails the directory is removed again, so
+    the catalogue and the directories stay in step.
 
     Returns a small descriptor for UI: {snapshot_id, display_name, snapshot_dir, created_at, parent_snapshot_id}
     """
@@ -81,6 +84,7 @@ def save_model_bundle_snapshot(
         "disc_rate_qaly_annual": bundle["disc_rate_qaly_annual"],
         "initial_occupancy": bundle["initial_occupancy"],
         "parameters_rich": bundle["parameters"],
+        "llm_usage": bundle.get("llm_usage"),  # token / cost / latency summary of the generation run
 
         "code": {
             "transition_matrix_data": transition_matrix_data,
@@ -90,6 +94,13 @@ def save_model_bundle_snapshot(
 
     (base / "snapshot.json").write_text(json.dumps(snapshot, indent=2), encoding="utf-8")
 
+    try:
+        with catalogue() as conn, conn:
+            index_snapshot(conn, snapshot, base)
+    except Exception:
+        shutil.rmtree(base, ignore_errors=True)
+        raise
+
     return {
         "snapshot_id": snapshot_id,
         "display_name": display_name,
@@ -101,6 +112,11 @@ def save_model_bundle_snapshot(
 
 
 
+def working_model_dir() -> Path:
+    """Directory of the working copy written by save_working_model_bundle."""
+    return Path(SNAPSHOT_ROOT) / WORKING_DIRNAME / WORKING_NAME
+
+
 def save_working_model_bundle( # for latest model
     *,
     bundle: Dict[str, Any],
@@ -115,7 +131,7 @@ def save_working_model_bundle( # for latest model
     """
     created_at = datetime.now(timezone.utc).isoformat()
 
-    base = Path(SNAPSHOT_ROOT) / WORKING_DIRNAME / WORKING_NAME
+    base = working_model_dir()
 
     # wipe existing working copy
     if base.exists():
@@ -157,6 +173,7 @@ def save_working_model_bundle( # for latest model
         "disc_rate_qaly_annual": bundle["disc_rate_qaly_annual"],
         "initial_occupancy": bundle["initial_occupancy"],
         "parameters_rich": bundle["parameters"],
+        "llm_usage": bundle.get("llm_usage"),  # token / cost / latency summary of the generation run
 
         "code": {
             "transition_matrix_data": transition_matrix_data,
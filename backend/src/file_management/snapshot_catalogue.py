@@ -0,0 +1,223 @@
+import argparse
+import json
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from backend.files.file_paths import snapshot_catalogue_path as CATALOGUE_PATH
+from backend.files.file_paths import snapshot_dir as SNAPSHOT_ROOT
+
+DESCRIPTION_PREVIEW_CHARS = 200
+
+SORT_COLUMNS = ("created_at", "display_name", "snapshot_id")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id         TEXT PRIMARY KEY,
+    display_name        TEXT NOT NULL,
+    created_at          TEXT,
+    parent_snapshot_id  TEXT,
+    model_description   TEXT NOT NULL DEFAULT '',
+    notes               TEXT,
+    snapshot_dir        TEXT NOT NULL,
+    indexed_at          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_created_at ON snapshots (created_at);
+CREATE INDEX IF NOT EXISTS snapshots_display_name ON snapshots (display_name);
+CREATE INDEX IF NOT EXISTS snapshots_parent ON snapshots (parent_snapshot_id);
+"""
+
+_COLUMNS = "snapshot_id, display_name, created_at, parent_snapshot_id, model_description, snapshot_dir"
+
+
+def _connect(path: str = CATALOGUE_PATH) -> sqlite3.Connection:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def catalogue(path: str = CATALOGUE_PATH) -> Iterator[sqlite3.Connection]:
+    """
+    Connection to the snapshot catalogue, rebuilt from disk first if the database does not exist yet
+    (e.g. snapshots saved before the catalogue was introduced).
+    """
+    exists = Path(path).exists()
+    with closing(_connect(path)) as conn:
+        if not exists:
+            _reindex(conn, SNAPSHOT_ROOT)
+        yield conn
+
+
+def _row(snap: Dict[str, Any], snapshot_dir: Path) -> Dict[str, Any]:
+    return {
+        "snapshot_id": snap["snapshot_id"],
+        "display_name": snap.get("display_name") or snapshot_dir.name,
+        "created_at": snap.get("created_at"),
+        "parent_snapshot_id": snap.get("parent_snapshot_id"),
+        "model_description": snap.get("model_description") or "",
+        "notes": snap.get("notes"),
+        "snapshot_dir": str(snapshot_dir),
+        "indexed_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def index_snapshot(conn: sqlite3.Connection, snap: Dict[str, Any], snapshot_dir: Path) -> None:
+    """Insert or replace one snapshot's catalogue row. Does not commit: run inside `with conn:`."""
+    row = _row(snap, snapshot_dir)
+    conn.execute(
+        f"INSERT OR REPLACE INTO snapshots ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+        list(row.values()),
+    )
+
+
+def _reindex(conn: sqlite3.Connection, root: str) -> int:
+    """Replace the catalogue contents with what is on disk, in one transaction."""
+    rows = 0
+    with conn:
+        conn.execute("DELETE FROM snapshots")
+        root_path = Path(root)
+        if not root_path.exists():
+            return 0
+        for d in root_path.iterdir():
+            snap_path = d / "snapshot.json"
+            if not d.is_dir() or not snap_path.exists():
+                continue
+            try:
+                snap = json.loads(snap_path.read_text(encoding="utf-8"))
+            except Exception:
+                # ignore broken snapshots
+                continue
+            if not snap.get("snapshot_id"):  # working copy
+                continue
+            index_snapshot(conn, snap, d)
+            rows += 1
+    return rows
+
+
+def rebuild_catalogue(path: str = CATALOGUE_PATH, root: str = SNAPSHOT_ROOT) -> int:
+    """Reindex every snapshot directory under root. Returns the number of snapshots indexed."""
+    with closing(_connect(path)) as conn:
+        return _reindex(conn, root)
+
+
+def _describe(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "snapshot_id": row["snapshot_id"],
+        "display_name": row["display_name"],
+        "created_at": row["created_at"],
+        "parent_snapshot_id": row["parent_snapshot_id"],
+        "model_description": (row["model_description"] or "")[:DESCRIPTION_PREVIEW_CHARS],
+        "snapshot_dir": row["snapshot_dir"],
+    }
+
+
+def _search_clause(search: Optional[str]) -> tuple:
+    if not search:
+        return "", []
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return (
+        "WHERE model_description LIKE ? ESCAPE '\\' OR display_name LIKE ? ESCAPE '\\'",
+        [f"%{escaped}%"] * 2,
+    )
+
+
+def query_snapshots(
+    *,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    sort: str = "created_at",
+    descending: bool = True,
+    search: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    One page of snapshot summaries. search: case-insensitive substring of the model description
+    (or display name).
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {SORT_COLUMNS}, got {sort!r}")
+    where, params = _search_clause(search)
+    order = "DESC" if descending else "ASC"
+
+    with catalogue() as conn:
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM snapshots {where} "
+            f"ORDER BY {sort} {order}, snapshot_id {order} LIMIT ? OFFSET ?",
+            [*params, -1 if limit is None else limit, offset],
+        ).fetchall()
+    return [_describe(r) for r in rows]
+
+
+def count_snapshots(search: Optional[str] = None) -> int:
+    where, params = _search_clause(search)
+    with catalogue() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM snapshots {where}", params).fetchone()[0]
+
+
+def snapshot_dir_for(snapshot_id: str) -> Optional[str]:
+    """Directory of a saved snapshot, or None if the catalogue does not know it."""
+    with catalogue() as conn:
+        row = conn.execute("SELECT snapshot_dir FROM snapshots WHERE snapshot_id = ?", [snapshot_id]).fetchone()
+    return row["snapshot_dir"] if row else None
+
+
+def snapshot_ancestors(snapshot_id: str) -> List[Dict[str, Any]]:
+    """The snapshot's parent, grandparent, ... nearest first."""
+    with catalogue() as conn:
+        rows = conn.execute(
+            f"""
+            WITH RECURSIVE lineage(id, depth) AS (
+                SELECT parent_snapshot_id, 1 FROM snapshots WHERE snapshot_id = ?
+                UNION
+                SELECT s.parent_snapshot_id, l.depth + 1
+                FROM snapshots s JOIN lineage l ON s.snapshot_id = l.id
+                WHERE s.parent_snapshot_id IS NOT NULL
+            )
+            SELECT {_COLUMNS} FROM snapshots JOIN lineage ON snapshot_id = lineage.id
+            ORDER BY lineage.depth
+            """,
+            [snapshot_id],
+        ).fetchall()
+    return [_describe(r) for r in rows]
+
+
+def snapshot_descendants(snapshot_id: str) -> List[Dict[str, Any]]:
+    """Every snapshot derived (directly or not) from snapshot_id, with its depth below it."""
+    with catalogue() as conn:
+        rows = conn.execute(
+            f"""
+            WITH RECURSIVE lineage(id, depth) AS (
+                SELECT snapshot_id, 1 FROM snapshots WHERE parent_snapshot_id = ?
+                UNION
+                SELECT s.snapshot_id, l.depth + 1
+                FROM snapshots s JOIN lineage l ON s.parent_snapshot_id = l.id
+            )
+            SELECT {_COLUMNS}, lineage.depth AS depth FROM snapshots JOIN lineage ON snapshot_id = lineage.id
+            ORDER BY lineage.depth, created_at
+            """,
+            [snapshot_id],
+        ).fetchall()
+    return [{**_describe(r), "depth": r["depth"]} for r in rows]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Model snapshot catalogue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="reindex every snapshot directory from disk")
+    ls = sub.add_parser("list", help="list snapshots")
+    ls.add_argument("--search")
+    ls.add_argument("--limit", type=int, default=20)
+    ls.add_argument("--offset", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        n = rebuild_catalogue()
+        print(f"Indexed {n} snapshots from {SNAPSHOT_ROOT}")
+    else:
+        for s in query_snapshots(limit=args.limit, offset=args.offset, search=args.search):
+            print(f'{s["snapshot_id"]}  {s["created_at"]}  {s["display_name"]}')
@@ -8,10 +8,13 @@ from backend.dummy_data.dummy_treatments import DUMMY_TREATMENTS_1
 from backend.src.file_management.save_snapshot import save_model_bundle_snapshot
 from backend.src.model_generation.settings.health_states import generate_health_states_and_initial_occupancy
 import time
-from backend.src.core.llm.llm_stats import llm_stats
+from backend.src.core.llm.llm_stats import LLMStats, get_llm_stats, llm_stats, use_llm_stats
+from backend.src.core.llm.llm_funcs import llm_stream_handler, run_blocking
 from backend.websockets.websocket_manager import manager
+from backend.websockets.result_stream import publish_bundle
 import asyncio
 from backend.src.file_management.save_snapshot import save_working_model_bundle
+from backend.src.services.job_manager import current_job, set_job_step
 
 PROCESS_NAME = "generate_model"
 
@@ -36,15 +39,48 @@ async def generate_model_bundle(
     disc_rate_qaly_annual: Any,
     disc_rate_cost_annual: Any,
     overwrite_existing_params: bool = False,
+    concurrent_events: bool = False,
+    max_event_concurrency: int = 4,
+    concurrent_parameters: bool = False,
+    max_parameter_concurrency: int = 4,
+    stream_llm_output: bool = True,
+    events_history_mode: str = "summary",
+    prompt_cache: bool = False,
 ) -> Dict[str, Any]:
     """
     Orchestrates:
       - transition matrix workflow
       - events_out workflow
     Produces a single in-memory, runnable bundle.
+
+    Each workflow is synchronous (blocking LLM calls), so it is awaited via run_blocking; the event
+    loop stays free for websocket traffic, other requests and other generation jobs.
+
+    events_history_mode: what happens to each finished event's turns in the events workflow
+    ("full" / "summary" / "drop", see build_events_workflow); prompt_cache: mark the events intro
+    as a provider prompt-cache prefix.
+
+    stream_llm_output: stream LLM replies, forwarding partial text as "llm_stream" messages (and
+    stopping each reply once its tagged block is complete).
     """
 
-    llm_stats.reset()
+    # usage for this generation only: the job's own accumulator, or a fresh one outside jobs
+    stats = get_llm_stats()
+    if stats is llm_stats:
+        stats = use_llm_stats(LLMStats())
+
+    if stream_llm_output:
+        # LLM calls run in worker threads; hop back onto the loop and hand the delta to the job's
+        # batcher synchronously (no task to keep alive or lose exceptions from). The context
+        # variable is local to this job's task, so concurrent jobs each forward their own output.
+        loop = asyncio.get_running_loop()
+        job = current_job.get()
+        job_id = job.job_id if job is not None else None
+
+        def _forward_llm_text(delta: str) -> None:
+            loop.call_soon_threadsafe(manager.post, "llm_stream", {"delta": delta}, PROCESS_NAME, False, job_id)
+
+        llm_stream_handler.set(_forward_llm_text)
 
     start = time.time()
 
@@ -57,6 +93,7 @@ async def generate_model_bundle(
 
     # 0) Parameters
 
+    set_job_step("Generating parameters")
     await manager.send_message(
         message_type="progress",
         payload={"message": f"Generating parameters [Step 1/4]"},
@@ -64,12 +101,15 @@ async def generate_model_bundle(
         process_complete=False,
     )
 
-    model_parameters = get_parameters(datapoints=data_points)
+    model_parameters = await run_blocking(get_parameters, datapoints=data_points,
+                                          concurrent=concurrent_parameters,
+                                          max_concurrency=max_parameter_concurrency)
 
     # TODO slight trickiness with dealing with parameters provided by user that are meant to inform initial health state
     # occupancies. We don't want these contaminating what happens, or being redundant. They won't be used in the
     # creation of the health state occupancies, as these vectors are raw parameters themselves
 
+    set_job_step("Composing health states")
     await manager.send_message(
         message_type="progress",
         payload={"message": f"Composing health states [Step 2/4]"},
@@ -78,12 +118,14 @@ async def generate_model_bundle(
     )
 
     # 1)
-    health_states_out = generate_health_states_and_initial_occupancy(model_description=model_description,
-                                                                     treatments=treatments, available_parameters=model_parameters)
+    health_states_out = await run_blocking(generate_health_states_and_initial_occupancy,
+                                           model_description=model_description,
+                                           treatments=treatments, available_parameters=model_parameters)
 
     health_states = health_states_out["health_states"]
     initial_occupancy = health_states_out["initial_state_occupancy"]
 
+    set_job_step("Calculating transitions")
     await manager.send_message(
         message_type="progress",
         payload={"message": f"Calculating transitions [Step 3/4]"},
@@ -92,7 +134,8 @@ async def generate_model_bundle(
     )
 
     # 2) transitions
-    transition_out = build_transition_matrix_workflow(
+    transition_out = await run_blocking(
+        build_transition_matrix_workflow,
         model_description=model_description,
         model_parameters=model_parameters,
         health_states=health_states,
@@ -100,6 +143,7 @@ async def generate_model_bundle(
     )
     # transition_out: { final_code, additional_parameters, model_parameters_augmented, history, raw }
 
+    set_job_step("Building events")
     await manager.send_message(
         message_type="progress",
         payload={"message": f"Building events [Step 4/4]"},
@@ -108,11 +152,16 @@ async def generate_model_bundle(
     )
 
     # 3) events_out (starting from augmented params so events_out see them)
-    events_out = build_events_workflow(
+    events_out = await run_blocking(
+        build_events_workflow,
         model_description=model_description,
         model_parameters=transition_out["model_parameters"],
         health_states=health_states,
         overwrite_existing_params=overwrite_existing_params,
+        concurrent=concurrent_events,
+        max_concurrency=max_event_concurrency,
+        history_mode=events_history_mode,
+        prompt_cache=prompt_cache,
     )
 
     # 4) final augmented params after all event additions
@@ -136,11 +185,11 @@ async def generate_model_bundle(
 
     print(f'Generated model in {round(time.time()-start,2)} seconds')
 
-    print(llm_stats.get_stats())
+    print(stats.get_stats())
 
-    llm_stats.reset()
+    bundle["llm_usage"] = stats.to_dict()
 
-    save_working_model_bundle(bundle=bundle) # save to temp working directory
+    await run_blocking(save_working_model_bundle, bundle=bundle) # save to temp working directory
 
     await manager.send_message(
         message_type="progress",
@@ -149,25 +198,22 @@ async def generate_model_bundle(
         process_complete=False,
     )
 
-    await manager.send_message(
-        message_type="model_bundle_ready",
-        payload={
-            "bundle": {
-                "model_description": bundle["model_description"],
-                "health_states": bundle["health_states"],
-                "treatments": bundle["treatments"],
-                "parameters": bundle["parameters"],
-                "initial_occupancy": bundle["initial_occupancy"],
-                "cycle_length_years": bundle["cycle_length_years"],
-                "time_horizon_years": bundle["time_horizon_years"],
-                "disc_rate_cost_annual": bundle["disc_rate_cost_annual"],
-                "disc_rate_qaly_annual": bundle["disc_rate_qaly_annual"],
-                "transition_matrix_data": bundle["transition_matrix_data"],
-                "event_data": bundle["event_data"],
-            }
+    # terminal message carries only a manifest; the client pulls the bundle in chunks
+    await publish_bundle(
+        {
+            "model_description": bundle["model_description"],
+            "health_states": bundle["health_states"],
+            "treatments": bundle["treatments"],
+            "initial_occupancy": bundle["initial_occupancy"],
+            "cycle_length_years": bundle["cycle_length_years"],
+            "time_horizon_years": bundle["time_horizon_years"],
+            "disc_rate_cost_annual": bundle["disc_rate_cost_annual"],
+            "disc_rate_qaly_annual": bundle["disc_rate_qaly_annual"],
+            "parameters": bundle["parameters"],
+            "transition_matrix_data": bundle["transition_matrix_data"],
+            "event_data": bundle["event_data"],
         },
         process_name=PROCESS_NAME,
-        process_complete=True,
     )
 
 
@@ -1,9 +1,18 @@
 import json
 import ast
+import functools
 from copy import deepcopy
 from typing import Any, Dict, List, Tuple, Optional
+from backend.src.core.llm.llm_cancel import run_all_or_cancel
 from backend.src.core.llm.llm_extract import extract_between_tags
 from backend.src.core.llm.llm_funcs import call_llm
+from backend.src.core.llm.llm_history import (
+    check_history_mode,
+    compact_turns,
+    completed_work_note,
+    mark_prompt_cache,
+    summarise_event,
+)
 from backend.src.core.llm.llm_log import llm_log
 from backend.src.model_generation.parameters.merge_additional_parameters import merge_additional_parameters_dict
 from backend.src.model_generation.events.templates import event_build, orchestrator_introduction, event_conceptualisation, events_build_loop_introduction, event_meta_data
@@ -58,12 +67,144 @@ def _parse_loose_list(text: str) -> List[Any]:
         raise ValueError(f"Could not parse additional parameters as JSON or Python list. Error: {e}")
 
 
+def _build_event(
+    *,
+    event_name: str,
+    event_desc: str,
+    model_description: str,
+    model_parameters: Dict[str, Dict[str, Any]],
+    health_states: List[str],
+    history: List[Dict[str, Any]],
+    prior_note: str = "",
+) -> Dict[str, Any]:
+    """
+    Runs the concept -> build -> metadata calls for one event on the given history (which is
+    extended in place). Parameters are not merged here; the caller decides how.
+    prior_note (see completed_work_note) is prefixed to the conceptualisation prompt.
+
+    Returns:
+      {
+        "event_data": {"event_name", "final_code", "metadata"},
+        "additional_parameters": list[dict],
+        "history": chat_history,
+        "raw": {"conceptualisation": str, "build": str},
+      }
+    """
+    # -------- a) CONCEPTUALISE --------
+    prompt_concept = prior_note + event_conceptualisation.format(
+        current_event_name=event_name,
+        current_event_description=event_desc,
+        model_description=model_description,
+        available_parameters=json.dumps(model_parameters, indent=2),
+        model_health_states=health_states,
+    )
+
+    resp_concept, history = call_llm(
+        prompt=prompt_concept,
+        image_titles=[],
+        image_b64s=[],
+        chat_history=history,
+    )
+    llm_log(chat_history=history, aspect=f"event_concept_{event_name}")
+
+    # Extract any additional parameters from conceptualisation
+    additional_parameters: List[Dict[str, Any]] = []
+    add_block = extract_between_tags(resp_concept, "additional_parameters", no_match_response=None)
+    if add_block:
+        additional_parameters = _parse_loose_list(add_block)
+        if not all(isinstance(x, dict) for x in additional_parameters):
+            raise ValueError("<additional_parameters> must contain an array of objects")
+
+    # -------- b) BUILD --------
+    prompt_build = event_build
+
+    resp_build, history = call_llm(
+        prompt=prompt_build,
+        image_titles=[],
+        image_b64s=[],
+        chat_history=history,
+        stop_after_tags=["final_code"],
+    )
+    llm_log(chat_history=history, aspect=f"event_build_{event_name}")
+
+    final_code = extract_between_tags(resp_build, "final_code", no_match_response=None)
+    if not final_code:
+        raise ValueError(f"No <final_code>...</final_code> block found for event: {event_name}")
+
+    # -------- c) METADATA --------
+    prompt_metadata = event_meta_data
+
+    resp_metadata, history = call_llm(
+        prompt=prompt_metadata,
+        image_titles=[],
+        image_b64s=[],
+        chat_history=history,
+        stop_after_tags=["metadata"],
+    )
+    llm_log(chat_history=history, aspect=f"event_build_{event_name}")
+
+    metadata = extract_between_tags(resp_metadata, "metadata", no_match_response=None)
+
+    if not metadata:
+        metadata = {"description": "None available", "assumptions": "None available"}
+    else:
+        metadata = _parse_loose_dict(text=metadata)
+
+    metadata["enabled"] = True # set to enabled by default
+
+    return {
+        "event_data": {
+            "event_name": event_name,
+            "final_code": final_code.strip(),
+            "metadata": metadata,
+        },
+        "additional_parameters": additional_parameters,
+        "history": history,
+        "raw": {"conceptualisation": resp_concept, "build": resp_build},
+    }
+
+
+def _merge_event_parameters(
+    model_parameters: Dict[str, Dict[str, Any]],
+    per_event_additional: List[Tuple[str, List[Dict[str, Any]]]],
+    *,
+    overwrite_existing: bool,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Reconcile additional parameters proposed by independently generated events, in event order.
+    The first definition of a name wins (unless overwrite_existing); conflicting later definitions
+    are reported, since the later event's code was written against its own value.
+    """
+    merged = model_parameters
+    first_source: Dict[str, str] = {}
+
+    for event_name, additional in per_event_additional:
+        for p in additional:
+            name = (p.get("parameter_name") or "").strip()
+            if not name:
+                continue
+            if name in first_source and merged[name].get("value") != p.get("value"):
+                print(
+                    f"Parameter '{name}' from event '{event_name}' conflicts with the definition from "
+                    f"'{first_source[name]}'; keeping {'the later' if overwrite_existing else 'the first'} definition"
+                )
+            first_source.setdefault(name, event_name)
+
+        merged = merge_additional_parameters_dict(merged, additional, overwrite_existing=overwrite_existing)
+
+    return merged
+
+
 def build_events_workflow(
     *,
     model_description: str,
     model_parameters: Dict[str, Dict[str, Any]],
     health_states: List[str],
     overwrite_existing_params: bool = False,
+    concurrent: bool = False,
+    max_concurrency: int = 4,
+    history_mode: str = "summary",
+    prompt_cache: bool = False,
 ) -> Dict[str, Any]:
     """
     Runs:
@@ -73,10 +214,24 @@ def build_events_workflow(
            a) event_conceptualisation (may emit <additional_parameters>)
            b) event_build (must emit <final_code>)
 
-    Key behavior:
-      - single shared chat_history across ALL calls
+    Key behavior (sequential, the default):
+      - one chat_history threaded through every call (compacted per history_mode)
       - parameters augmented as we go; later events see earlier additions
 
+    concurrent=True: after 2), the history is forked and events are generated in parallel
+    (at most max_concurrency at a time), so events do not see each other's turns or parameters.
+    Each event sees the parameters as they were at the fork; additional parameters are reconciled
+    afterwards, in event order. If one event fails, the others are cancelled and the error is
+    raised without waiting for them.
+
+    history_mode ("full" / "summary" / "drop", sequential only): what happens to an event's turns
+    once it is finished. "full" resends them with every later call, so input tokens grow
+    quadratically with the number of events; "summary" removes them and tells the next event what
+    was completed in a labelled note at the top of its first prompt; "drop" keeps only the intro
+    turns. Later events still see earlier additions via available_parameters.
+
+    prompt_cache=True marks the intro turns as a provider prompt-cache prefix.
+
     Returns:
       {
         "event_recommendations": dict[str, str],
@@ -106,6 +261,7 @@ def build_events_workflow(
         image_titles=[],
         image_b64s=[],
         chat_history=None,
+        stop_after_tags=["event_recommendations"],
     )
     llm_log(chat_history=history, aspect="events_orchestrator_intro")
 
@@ -129,6 +285,10 @@ def build_events_workflow(
     )
     llm_log(chat_history=history, aspect="events_build_loop_intro")
 
+    check_history_mode(history_mode)
+    if prompt_cache:
+        history = mark_prompt_cache(history)
+
     # -----------------------
     # 3) ITERATE EVENTS
     # -----------------------
@@ -145,86 +305,69 @@ def build_events_workflow(
     ordered_event_names = list(event_recommendations.keys())
 
 
-    for event_name in ordered_event_names:
-        event_desc = event_recommendations[event_name]
-
-        # -------- 3a) CONCEPTUALISE --------
-        prompt_concept = event_conceptualisation.format(
-            current_event_name=event_name,
-            current_event_description=event_desc,
-            model_description=model_description,
-            available_parameters=json.dumps(model_parameters_aug, indent=2),
-            model_health_states=health_states,
-        )
-
-        resp_concept, history = call_llm(
-            prompt=prompt_concept,
-            image_titles=[],
-            image_b64s=[],
-            chat_history=history,
-        )
-        llm_log(chat_history=history, aspect=f"event_concept_{event_name}")
-        conceptualisations_raw[event_name] = resp_concept
-
-        # Extract + merge any additional parameters from conceptualisation
-        add_block = extract_between_tags(resp_concept, "additional_parameters", no_match_response=None)
-        if add_block:
-            additional_parameters = _parse_loose_list(add_block)
-            if not all(isinstance(x, dict) for x in additional_parameters):
-                raise ValueError("<additional_parameters> must contain an array of objects")
-
-            additional_parameters_all.extend(additional_parameters)
-
-            model_parameters_aug = merge_additional_parameters_dict(
-                model_parameters_aug,
-                additional_parameters,
-                overwrite_existing=overwrite_existing_params,
+    if not concurrent:
+        summaries: List[str] = []  # history_mode="summary": notes on the events whose turns were removed
+        for event_name in ordered_event_names:
+            event_start = len(history)
+            out = _build_event(
+                event_name=event_name,
+                event_desc=event_recommendations[event_name],
+                model_description=model_description,
+                model_parameters=model_parameters_aug,
+                health_states=health_states,
+                history=history,
+                prior_note=completed_work_note(summaries),
             )
-
-        prompt_build = event_build
-
-        resp_build, history = call_llm(
-            prompt=prompt_build,
-            image_titles=[],
-            image_b64s=[],
-            chat_history=history,
+            history = compact_turns(out["history"], event_start, history_mode)
+            if history_mode == "summary":
+                summaries.append(summarise_event(event_name, out["additional_parameters"]))
+            conceptualisations_raw[event_name] = out["raw"]["conceptualisation"]
+            builds_raw[event_name] = out["raw"]["build"]
+
+            # merge as we go; later events see earlier additions
+            if out["additional_parameters"]:
+                additional_parameters_all.extend(out["additional_parameters"])
+                model_parameters_aug = merge_additional_parameters_dict(
+                    model_parameters_aug,
+                    out["additional_parameters"],
+                    overwrite_existing=overwrite_existing_params,
+                )
+
+            event_data.append(out["event_data"])
+            event_metadatas.append(out["event_data"]["metadata"])
+
+    else:
+        # fork the shared history after the build-loop intro; each event gets its own copy and
+        # sees only the parameters available at the fork
+        outs = run_all_or_cancel(
+            [
+                functools.partial(
+                    _build_event,
+                    event_name=event_name,
+                    event_desc=event_recommendations[event_name],
+                    model_description=model_description,
+                    model_parameters=model_parameters_aug,
+                    health_states=health_states,
+                    history=deepcopy(history),
+                )
+                for event_name in ordered_event_names
+            ],
+            max_workers=max_concurrency,
         )
-        llm_log(chat_history=history, aspect=f"event_build_{event_name}")
-        builds_raw[event_name] = resp_build
 
-        final_code = extract_between_tags(resp_build, "final_code", no_match_response=None)
-        if not final_code:
-            raise ValueError(f"No <final_code>...</final_code> block found for event: {event_name}")
-
-        prompt_metadata = event_meta_data
-
-        resp_metadata, history = call_llm(
-            prompt=prompt_metadata,
-            image_titles=[],
-            image_b64s=[],
-            chat_history=history,
-        )
-        llm_log(chat_history=history, aspect=f"event_build_{event_name}")
-
-        metadata = extract_between_tags(resp_metadata, "metadata", no_match_response=None)
-
-        if not metadata:
-            metadata = {"description": "None available", "assumptions": "None available"}
-        else:
-            metadata = _parse_loose_dict(text=metadata)
-
-        metadata["enabled"] = True # set to enabled by default
-
-        event_data.append(
-            {
-                "event_name": event_name,
-                "final_code": final_code.strip(),
-                "metadata": metadata
-            }
+        for event_name, out in zip(ordered_event_names, outs):
+            conceptualisations_raw[event_name] = out["raw"]["conceptualisation"]
+            builds_raw[event_name] = out["raw"]["build"]
+            additional_parameters_all.extend(out["additional_parameters"])
+            event_data.append(out["event_data"])
+            event_metadatas.append(out["event_data"]["metadata"])
+
+        model_parameters_aug = _merge_event_parameters(
+            model_parameters_aug,
+            [(name, out["additional_parameters"]) for name, out in zip(ordered_event_names, outs)],
+            overwrite_existing=overwrite_existing_params,
         )
 
-        event_metadatas.append(metadata)
-
     return {
         "event_recommendations": event_recommendations,
         "event_data": event_data,
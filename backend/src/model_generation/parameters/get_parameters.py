@@ -2,6 +2,8 @@ from backend.src.model_generation.parameters.templates import transform_datapoin
 from backend.src.core.llm.llm_funcs import call_llm
 from backend.src.core.llm.llm_log import llm_log
 import re
+import functools
+from backend.src.core.llm.llm_cancel import run_all_or_cancel
 from typing import List, Any, Dict, Optional
 import json
 from backend.dummy_data.dummy_model_datapoints import DUMMY_MODEL_DATAPOINTS_2
@@ -62,51 +64,86 @@ def _coerce_num(x: Any) -> Optional[float]:
     except ValueError:
         return None
 
+def _transform_chunk(
+    chunk_idx: int,
+    chunk: List[Dict[str, Any]],
+    history: Optional[list],
+    aspect_prefix: str,
+):
+    datapoints_json = json.dumps(chunk, ensure_ascii=False, indent=2)
+    prompt = transform_datapoints.format(datapoints_json=datapoints_json)
+
+    response_text, history = call_llm(
+        prompt=prompt,
+        image_titles=[],
+        image_b64s=[],
+        chat_history=history,
+    )
+
+    llm_log(chat_history=history, aspect=f"{aspect_prefix}_chunk_{chunk_idx}")
+
+    items = _extract_json_array(response_text)
+
+    # Strictness: ensure 1-to-1 mapping within a chunk
+    if len(items) != len(chunk):
+        raise ValueError(
+            f"Chunk {chunk_idx}: expected {len(chunk)} outputs, got {len(items)}."
+        )
+
+    return items, history
+
+def _add_parameters(parameters: Dict[str, Dict[str, Any]], items: List[Dict[str, Any]], used_names: set) -> None:
+    for it in items:
+        raw_name = it.get("parameter_name", "")
+        name = _sanitize_name(raw_name)
+        name = _dedupe_name(name, used_names)
+
+        parameters[name] = {
+            "value": _coerce_num(it.get("value")),
+            "description": str(it.get("description") or "").strip(),
+            "distribution": (str(it.get("distribution")).strip() if it.get("distribution") is not None else None),
+            "standard_error": _coerce_num(it.get("standard_error")),
+        }
+
 def get_parameters(
     *,
     datapoints: List[Dict[str, Any]],
     chunk_size: int = 25,
     aspect_prefix: str = "get_parameters",
+    concurrent: bool = False,
+    max_concurrency: int = 4,
 ) -> Dict[str, Dict[str, Any]]:
+    """
+    Sequential (default): chunks share a rolling history, so the LLM sees earlier chunks' names.
+    concurrent=True: each chunk is transformed independently (at most max_concurrency at once);
+    names are then sanitised and de-duplicated in chunk order, so the result does not depend on
+    which chunk finishes first.
+    """
     used_names: set = set()
     parameters: Dict[str, Dict[str, Any]] = {}
 
-    history = None
-
     chunks = chunk_list(datapoints, chunk_size)
 
-    for chunk_idx, chunk in enumerate(chunks, start=1):
-        datapoints_json = json.dumps(chunk, ensure_ascii=False, indent=2)
-        prompt = transform_datapoints.format(datapoints_json=datapoints_json)
-
-        response_text, history = call_llm(
-            prompt=prompt,
-            image_titles=[],
-            image_b64s=[],
-            chat_history=history,   # <-- rolling history
+    if concurrent:
+        # fails fast: the other chunks' LLM calls are cancelled as soon as one chunk fails
+        results = run_all_or_cancel(
+            [
+                functools.partial(_transform_chunk, chunk_idx, chunk, None, aspect_prefix)
+                for chunk_idx, chunk in enumerate(chunks, start=1)
+            ],
+            max_workers=max_concurrency,
         )
 
-        llm_log(chat_history=history, aspect=f"{aspect_prefix}_chunk_{chunk_idx}")
-
-        items = _extract_json_array(response_text)
+        for items, _ in results:
+            _add_parameters(parameters, items, used_names)
 
-        # Strictness: ensure 1-to-1 mapping within a chunk
-        if len(items) != len(chunk):
-            raise ValueError(
-                f"Chunk {chunk_idx}: expected {len(chunk)} outputs, got {len(items)}."
-            )
+        return parameters
 
-        for it in items:
-            raw_name = it.get("parameter_name", "")
-            name = _sanitize_name(raw_name)
-            name = _dedupe_name(name, used_names)
+    history = None
 
-            parameters[name] = {
-                "value": _coerce_num(it.get("value")),
-                "description": str(it.get("description") or "").strip(),
-                "distribution": (str(it.get("distribution")).strip() if it.get("distribution") is not None else None),
-                "standard_error": _coerce_num(it.get("standard_error")),
-            }
+    for chunk_idx, chunk in enumerate(chunks, start=1):
+        items, history = _transform_chunk(chunk_idx, chunk, history, aspect_prefix)  # <-- rolling history
+        _add_parameters(parameters, items, used_names)
 
     return parameters
 
@@ -147,6 +147,7 @@ def generate_health_states_and_initial_occupancy(
         image_titles=[],
         image_b64s=[],
         chat_history=chat_history,
+        stop_after_tags=["model_health_states"],
     )
     llm_log(chat_history=history, aspect="health_states_generation")
 
@@ -167,6 +168,7 @@ def generate_health_states_and_initial_occupancy(
         image_titles=[],
         image_b64s=[],
         chat_history=history,
+        stop_after_tags=["initial_state_occupancy"],
     )
     llm_log(chat_history=history, aspect="initial_state_occupancy_generation")
 
@@ -111,6 +111,7 @@ def build_transition_matrix_workflow(
         image_titles=[],
         image_b64s=[],
         chat_history=history,
+        stop_after_tags=["final_code"],
     )
     llm_log(chat_history=history, aspect=f"transition_matrix_build")
 
@@ -130,6 +131,7 @@ def build_transition_matrix_workflow(
         image_titles=[],
         image_b64s=[],
         chat_history=history,
+        stop_after_tags=["metadata"],
     )
     llm_log(chat_history=history, aspect=f"transition_matrix_metadata")
 
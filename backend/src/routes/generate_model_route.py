@@ -1,4 +1,3 @@
-import asyncio
 import uuid
 import logging
 from typing import Any, Dict, List
@@ -8,6 +7,7 @@ from pydantic import BaseModel, Field
 
 from backend.src.model_generation.bundling.generate_model_bundle import generate_model_bundle
 from backend.websockets.websocket_manager import manager
+from backend.src.services.job_manager import JobQueueFull, job_manager
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -34,7 +34,7 @@ class GenerateModelRequest(BaseModel):
 
 class GenerateModelResponse(BaseModel):
     job_id: str
-    status: str  # "started"
+    status: str  # "queued" / "running" (see job_manager)
 
 
 @router.post("/", response_model=GenerateModelResponse)
@@ -57,20 +57,24 @@ async def generate_model(req: GenerateModelRequest):
                                         treatments=treatments, data_points=req.data_points, time_horizon_years=req.time_horizon_years,
                                         cycle_length_years=req.cycle_length_years, disc_rate_cost_annual=req.disc_rate_cost_annual,
                                         disc_rate_qaly_annual=req.disc_rate_qaly_annual)
-        except Exception as e:
-            logger.exception("generate_model failed (job_id=%s)", job_id)
+        except BaseException as e:
+            cancelled = job_manager.get(job_id).cancel_token.cancelled
+            message = "⏹ Generation cancelled." if cancelled else f"❌ Generation failed: {type(e).__name__}: {e}"
             # Push an error to the UI log and mark complete
             try:
                 await manager.send_message(
                     message_type="progress",
-                    payload={"message": f"❌ Generation failed: {type(e).__name__}: {e}"},
+                    payload={"message": message},
                     process_name=PROCESS_NAME,
                     process_complete=True,
                 )
             except Exception:
                 logger.exception("Failed to send WS error message")
+            raise  # job manager records failed / cancelled
 
+    try:
+        job = job_manager.submit(_runner, process_name=PROCESS_NAME, job_id=job_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many generation jobs queued ({e}). Try again later.")
 
-    asyncio.create_task(_runner())
-
-    return GenerateModelResponse(job_id=job_id, status="started")
+    return GenerateModelResponse(job_id=job.job_id, status=job.status)
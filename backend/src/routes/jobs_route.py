@@ -0,0 +1,28 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from backend.src.services.job_manager import job_manager
+
+router = APIRouter()
+
+
+@router.get("/")
+async def list_jobs(status: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [job.to_dict() for job in job_manager.list(status=status)]
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
@@ -0,0 +1,65 @@
+import uuid
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from backend.src.run_model.discounting import HALF_CYCLE_CORRECTIONS
+from backend.src.services.run_model_service import PROCESS_NAME, resolve_model_dir, run_model_job
+from backend.websockets.websocket_manager import manager
+from backend.src.services.job_manager import JobQueueFull, job_manager
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+class RunModelRequest(BaseModel):
+    # a saved snapshot, or None for the working copy of the latest generated model; the model's
+    # code is always loaded from the server, never taken from the request
+    snapshot_id: Optional[str] = None
+    half_cycle_correction: Optional[str] = None  # None / "first" / "trapezoidal"
+
+
+class RunModelResponse(BaseModel):
+    job_id: str
+    status: str  # "queued" / "running" (see job_manager)
+
+
+@router.post("/", response_model=RunModelResponse)
+async def run_model(req: RunModelRequest):
+    if req.half_cycle_correction not in HALF_CYCLE_CORRECTIONS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"half_cycle_correction must be one of {list(HALF_CYCLE_CORRECTIONS)}",
+        )
+    try:
+        model_dir = resolve_model_dir(req.snapshot_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    job_id = uuid.uuid4().hex
+
+    async def _runner():
+        try:
+            await run_model_job(model_dir=model_dir, half_cycle_correction=req.half_cycle_correction)
+        except BaseException as e:
+            cancelled = job_manager.get(job_id).cancel_token.cancelled
+            message = "⏹ Model run cancelled." if cancelled else f"❌ Model run failed: {type(e).__name__}: {e}"
+            try:
+                await manager.send_message(
+                    message_type="progress",
+                    payload={"message": message},
+                    process_name=PROCESS_NAME,
+                    process_complete=True,
+                )
+            except Exception:
+                logger.exception("Failed to send WS error message")
+            raise  # job manager records failed / cancelled
+
+    try:
+        job = job_manager.submit(_runner, process_name=PROCESS_NAME, job_id=job_id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many jobs queued ({e}). Try again later.")
+
+    return RunModelResponse(job_id=job.job_id, status=job.status)
@@ -0,0 +1,83 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from backend.src.run_model.globals import EventImpact
+
+
+class OutcomeAccumulator:
+    """
+    Dense store of per-cycle outcomes for one treatment arm.
+
+    Costs and QALYs are held as (cycles, states, events) arrays, filled one cycle at a time
+    by the runner. Every total (by state, by event, by state x event, discounted/undiscounted)
+    is derived with array reductions once the cycle loop has finished (see results.MarkovResults).
+    """
+
+    def __init__(self, *, n_cycles: int, health_states: List[str], event_names: List[str]):
+        self.health_states = list(health_states)
+        # duplicate event names collapse onto one column (matches the old dict-keyed breakdowns);
+        # the original list is kept as MarkovResults.legacy_event_names
+        self.event_names = list(dict.fromkeys(event_names))
+        self.event_index: Dict[str, int] = {name: j for j, name in enumerate(self.event_names)}
+
+        shape = (n_cycles, len(self.health_states), len(self.event_names))
+        self.costs = np.zeros(shape, dtype=float)
+        self.qalys = np.zeros(shape, dtype=float)
+
+    def record(
+        self,
+        *,
+        cycle: int,
+        s_t: np.ndarray,
+        F_t: np.ndarray,
+        per_event_impacts: Dict[str, EventImpact],
+    ) -> None:
+        """
+        Occupancy effects are s_t * per-state impact; flow effects are attributed to the
+        origin state, i.e. row sums of F_t * per-transition impact.
+        """
+        costs_t = self.costs[cycle]
+        qalys_t = self.qalys[cycle]
+
+        for ename, impact in per_event_impacts.items():
+            j = self.event_index[ename]
+            costs_t[:, j] = (
+                s_t * impact.cost_occupation.as_array()
+                + (F_t * impact.cost_flow.as_array()).sum(axis=1)
+            )
+            qalys_t[:, j] = (
+                s_t * impact.qaly_occupation.as_array()
+                + (F_t * impact.qaly_flow.as_array()).sum(axis=1)
+            )
+
+    def record_cycles(
+        self,
+        *,
+        s: np.ndarray,
+        P: np.ndarray,
+        per_event_impacts: Dict[str, EventImpact],
+    ) -> None:
+        """
+        record() for every cycle at once, for a constant transition matrix P and impacts that do
+        not change with the cycle. s: occupancy at the start of each cycle, shape (cycles, states).
+        With F_t = s_t[:, None] * P, the flow term is s_t * row sums of P * per-transition impact,
+        so each event costs one (cycles, states) product.
+        """
+        for ename, impact in per_event_impacts.items():
+            j = self.event_index[ename]
+            self.costs[:, :, j] = s * (
+                impact.cost_occupation.as_array() + (P * impact.cost_flow.as_array()).sum(axis=1)
+            )
+            self.qalys[:, :, j] = s * (
+                impact.qaly_occupation.as_array() + (P * impact.qaly_flow.as_array()).sum(axis=1)
+            )
+
+    # -------------------------
+    # Reductions
+    # -------------------------
+
+    def discounted_totals(self, *, df_cost: np.ndarray, df_qaly: np.ndarray) -> Tuple[float, float]:
+        """(cost_total, qaly_total) after discounting, without building any breakdowns."""
+        return (
+            float(df_cost @ self.costs.sum(axis=(1, 2))),
+            float(df_qaly @ self.qalys.sum(axis=(1, 2))),
+        )
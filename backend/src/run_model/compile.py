@@ -1,4 +1,15 @@
-from typing import Callable, Dict, Any, List
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import CodeType
+from typing import Callable, Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
 
 
 def flatten_parameters(parameters_rich: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
@@ -8,13 +19,112 @@ def flatten_parameters(parameters_rich: Dict[str, Dict[str, Any]]) -> Dict[str,
     return {k: v.get("value") for k, v in parameters_rich.items()}
 
 
-def _exec_code(code: str, globals_ns: Dict[str, Any]) -> Dict[str, Any]:
+# -------------------------
+# Compiled-code cache
+# -------------------------
+# Code objects are keyed by SHA-256 of the source and LRU-evicted. Only compilation is cached:
+# every call still execs into a fresh namespace, so module-level state in generated code is
+# never shared between runs or PSA iterations. Set MODEL_CODE_CACHE_DIR (or call
+# configure_code_cache) to also marshal code objects to disk across processes; if the
+# directory cannot be read or written, code is compiled in memory as usual.
+
+_cache_lock = threading.Lock()
+_cache_max_entries = 512
+_cache_dir: Optional[Path] = Path(os.environ["MODEL_CODE_CACHE_DIR"]) if os.getenv("MODEL_CODE_CACHE_DIR") else None
+_code_cache: "OrderedDict[str, CodeType]" = OrderedDict()
+
+
+def configure_code_cache(*, max_entries: Optional[int] = None, cache_dir: Optional[str] = None) -> None:
+    """Set the in-memory LRU size and/or the on-disk marshal directory (None leaves it unchanged)."""
+    global _cache_max_entries, _cache_dir
+    with _cache_lock:
+        if max_entries is not None:
+            _cache_max_entries = max_entries
+        if cache_dir is not None:
+            _cache_dir = Path(cache_dir)
+        _evict(_code_cache)
+
+
+def clear_code_cache() -> None:
+    """Drop all in-memory entries (the on-disk cache is left alone)."""
+    with _cache_lock:
+        _code_cache.clear()
+
+
+def _evict(cache: OrderedDict) -> None:
+    while len(cache) > _cache_max_entries:
+        cache.popitem(last=False)
+
+
+def _source_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def _disk_path(digest: str) -> Optional[Path]:
+    if _cache_dir is None:
+        return None
+    # marshal output is only valid for the interpreter version that wrote it
+    return _cache_dir / f"{digest}.{sys.implementation.cache_tag}.marshal"
+
+
+def _read_marshalled(path: Path) -> Optional[CodeType]:
+    try:
+        return marshal.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        # unreadable, corrupt or foreign entry: recompile
+        logger.warning("Code cache: ignoring %s: %s", path, e)
+        return None
+
+
+def _write_marshalled(path: Path, compiled: CodeType) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(marshal.dumps(compiled))
+        os.replace(tmp, path)
+    except OSError as e:
+        # read-only or full disk: keep the in-memory code object only
+        logger.warning("Code cache: could not write %s: %s", path, e)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _compile_code(code: str, digest: str) -> CodeType:
+    with _cache_lock:
+        compiled = _code_cache.get(digest)
+        if compiled is not None:
+            _code_cache.move_to_end(digest)
+            return compiled
+
+    path = _disk_path(digest)
+    compiled = _read_marshalled(path) if path is not None else None
+
+    if compiled is None:
+        compiled = compile(code, f"<generated:{digest[:12]}>", "exec")
+        if path is not None:
+            _write_marshalled(path, compiled)
+
+    with _cache_lock:
+        _code_cache[digest] = compiled
+        _evict(_code_cache)
+    return compiled
+
+
+def _exec_code(code: str, globals_ns: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
     """
     Execute generated code in a controlled namespace.
     globals_ns should include any framework symbols the code references.
+
+    With use_cache, the compiled code object for identical source is reused (parsing is
+    skipped); it is still executed into a fresh namespace on every call.
     """
+    compiled = _compile_code(code, _source_hash(code)) if use_cache else code
     ns: Dict[str, Any] = dict(globals_ns)
-    exec(code, ns, ns)  # noqa: S102 (you are executing trusted code from your own generator)
+    exec(compiled, ns, ns)  # noqa: S102 (you are executing trusted code from your own generator)
     return ns
 
 
@@ -22,8 +132,9 @@ def compile_transition_fn(
     *,
     transition_code: str,
     globals_ns: Dict[str, Any],
+    use_cache: bool = True,
 ) -> Callable:
-    ns = _exec_code(transition_code, globals_ns)
+    ns = _exec_code(transition_code, globals_ns, use_cache=use_cache)
     fn = ns.get("get_transition_matrix")
     if fn is None or not callable(fn):
         raise ValueError("Transition code must define callable get_transition_matrix(context)")
@@ -34,6 +145,7 @@ def compile_event_specs(
     *,
     events_code: List[str],
     globals_ns: Dict[str, Any],
+    use_cache: bool = True,
 ) -> List[Any]:
     """
     Each event code block must define exactly one EventSpec instance.
@@ -41,7 +153,7 @@ def compile_event_specs(
     """
     specs = []
     for code in events_code:
-        ns = _exec_code(code, globals_ns)
+        ns = _exec_code(code, globals_ns, use_cache=use_cache)
 
         event_spec = None
         for v in ns.values():
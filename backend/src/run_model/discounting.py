@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+
+DISCOUNT_TIMINGS = ("start", "mid", "end")
+HALF_CYCLE_CORRECTIONS = (None, "first", "trapezoidal")
+
+
+@dataclass(frozen=True)
+class DiscountSchedule:
+    """
+    Per-cycle multipliers, each shape (cycles,), read-only (schedules are shared between runs):
+      - cost / qaly: discount factors 1 / (1 + r) ** t, t taken at the start, middle or end of the cycle
+      - correction: half-cycle correction weights applied to every per-cycle outcome (ones if none)
+    """
+    cost: np.ndarray
+    qaly: np.ndarray
+    correction: np.ndarray
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
+    return arr
+
+
+def cycle_times_years(n_cycles: int, cycle_length_years: float, discount_timing: str = "mid") -> np.ndarray:
+    """Time (years) at which each cycle's outcomes are discounted."""
+    offsets = {"start": 0.0, "mid": 0.5, "end": 1.0}
+    if discount_timing not in offsets:
+        raise ValueError("discount_timing must be 'start', 'mid', or 'end'")
+    return (np.arange(n_cycles, dtype=float) + offsets[discount_timing]) * cycle_length_years
+
+
+def half_cycle_weights(n_cycles: int, half_cycle_correction: Optional[str] = None) -> np.ndarray:
+    """
+    None: no correction. "first": halve the first cycle. "trapezoidal": halve the first and last
+    cycles (trapezium rule over the trace).
+    """
+    if half_cycle_correction not in HALF_CYCLE_CORRECTIONS:
+        raise ValueError(f"half_cycle_correction must be one of {HALF_CYCLE_CORRECTIONS}")
+    weights = np.ones(n_cycles, dtype=float)
+    if n_cycles and half_cycle_correction in ("first", "trapezoidal"):
+        weights[0] = 0.5
+    if n_cycles and half_cycle_correction == "trapezoidal":
+        weights[-1] = 0.5
+    return weights
+
+
+@lru_cache(maxsize=128)
+def discount_schedule(
+    *,
+    n_cycles: int,
+    cycle_length_years: float,
+    disc_rate_cost_annual: float,
+    disc_rate_qaly_annual: float,
+    discount_timing: str = "mid",
+    half_cycle_correction: Optional[str] = None,
+) -> DiscountSchedule:
+    """
+    Cached per settings, so repeated runs with identical settings (PSA iterations, scenario sweeps
+    that leave discounting alone) reuse the same arrays.
+    """
+    t_years = cycle_times_years(n_cycles, cycle_length_years, discount_timing)
+
+    return DiscountSchedule(
+        cost=_read_only(1.0 / ((1.0 + disc_rate_cost_annual) ** t_years)),
+        qaly=_read_only(1.0 / ((1.0 + disc_rate_qaly_annual) ** t_years)),
+        correction=_read_only(half_cycle_weights(n_cycles, half_cycle_correction)),
+    )
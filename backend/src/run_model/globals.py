@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Any, Optional, List, Callable, Set
+from backend.src.run_model.invariance import reads_context_field
 
 State = str
 Treatment: str
@@ -148,10 +149,77 @@ def validate_transition_matrix(P: np.ndarray, *, tol: float = 1e-10) -> np.ndarr
 def event_applies(spec: EventSpec, ctx: EventContext) -> bool:
     if not spec.enabled:
         return False
-    if spec.applies_to_treatments is not None and ctx.treatment not in spec.applies_to_treatments:
+    applies_to_treatments = getattr(spec, "applies_to_treatments", None)
+    if applies_to_treatments is not None and ctx.treatment not in applies_to_treatments:
         return False
     return True
 
+EVENT_CONSTANT = "constant"
+EVENT_TREATMENT_DEPENDENT = "treatment"
+EVENT_CYCLE_DEPENDENT = "cycle"
+
+
+def classify_event(spec: EventSpec) -> str:
+    """
+    EVENT_CYCLE_DEPENDENT if the calculation function can read context.cycle,
+    EVENT_TREATMENT_DEPENDENT if it can read context.treatment, otherwise EVENT_CONSTANT.
+    """
+    fn = spec.calculation_function
+    if reads_context_field(fn, "cycle"):
+        return EVENT_CYCLE_DEPENDENT
+    if reads_context_field(fn, "treatment"):
+        return EVENT_TREATMENT_DEPENDENT
+    return EVENT_CONSTANT
+
+
+def classify_events(event_specs: List[EventSpec]) -> Dict[int, str]:
+    """classify_event for every spec, keyed by id(spec) (as ImpactCache expects)."""
+    return {id(spec): classify_event(spec) for spec in event_specs}
+
+
+class ImpactCache:
+    """
+    Memo of event impacts that do not change with the cycle, for use within ONE model run
+    (the parameters must not change while it is in use).
+
+    Constant events are evaluated once, treatment-dependent events once per treatment;
+    cycle-dependent events are always re-evaluated. Cached EventImpacts are shared between
+    cycles, so callers must treat them as read-only.
+
+    classes: precomputed classify_events(...), so repeated runs of the same compiled model
+    (e.g. PSA iterations) skip the static analysis.
+    """
+
+    def __init__(self, classes: Optional[Dict[int, str]] = None):
+        self._classes: Dict[int, str] = dict(classes) if classes else {}
+        self._impacts: Dict[Any, EventImpact] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+
+    def classify(self, spec: EventSpec) -> str:
+        key = id(spec)
+        if key not in self._classes:
+            self._classes[key] = classify_event(spec)
+        return self._classes[key]
+
+    def impact(self, spec: EventSpec, context: EventContext) -> EventImpact:
+        kind = self.classify(spec)
+        if kind == EVENT_CYCLE_DEPENDENT:
+            return spec.calculation_function(context)
+
+        key = id(spec) if kind == EVENT_CONSTANT else (id(spec), context.treatment)
+        if key not in self._impacts:
+            self._impacts[key] = spec.calculation_function(context)
+        return self._impacts[key]
+
+    def cached_result(self, treatment: str) -> Optional[Dict[str, Any]]:
+        return self._results.get(treatment)
+
+    def store_result(self, treatment: str, result: Dict[str, Any], event_specs: List[EventSpec]) -> None:
+        """Keep a full compile_impacts result if none of the enabled events depend on the cycle."""
+        if all(self.classify(e) != EVENT_CYCLE_DEPENDENT for e in event_specs if e.enabled):
+            self._results[treatment] = result
+
+
 def compile_impacts(
     *,
     health_states: List[State],
@@ -161,12 +229,21 @@ def compile_impacts(
     event_specs: List[EventSpec],
     cycle_length_years: Any,
     time_horizon_years: Any,
+    impact_cache: Optional[ImpactCache] = None,
 ) -> Dict[str, Any]:
     """
     Returns:
       - total_impact: EventImpact with summed effects
       - per_event_impacts: dict[event_name] -> EventImpact
+
+    impact_cache: reuse impacts of cycle-invariant events (see ImpactCache). When no event is
+    cycle-dependent, the whole result for the treatment is computed once and returned as-is.
     """
+    if impact_cache is not None:
+        cached = impact_cache.cached_result(treatment)
+        if cached is not None:
+            return cached
+
     context = EventContext(
         cycle=cycle,
         treatment=treatment,
@@ -183,7 +260,10 @@ def compile_impacts(
         if not event_applies(event_spec, context):
             continue
 
-        impact = event_spec.calculation_function(context)
+        if impact_cache is None:
+            impact = event_spec.calculation_function(context)
+        else:
+            impact = impact_cache.impact(event_spec, context)
         per_event_impacts[event_spec.event_name] = impact
 
         # --- add underlying numpy arrays ---
@@ -192,7 +272,12 @@ def compile_impacts(
         total_impact.cost_flow.as_array()[:, :] += impact.cost_flow.as_array()
         total_impact.qaly_flow.as_array()[:, :] += impact.qaly_flow.as_array()
 
-    return {
+    result = {
         "total_impact": total_impact,
         "per_event_impacts": per_event_impacts,
-    }
\ No newline at end of file
+    }
+
+    if impact_cache is not None:
+        impact_cache.store_result(treatment, result, event_specs)
+
+    return result
\ No newline at end of file
@@ -0,0 +1,60 @@
+from types import CodeType, FunctionType
+from typing import Any, Iterable, Set
+
+# Names that let generated code reach context fields without a plain attribute access
+# (e.g. getattr(context, "cyc" + "le"), context.__dict__["cycle"], context.__getattribute__("cycle"),
+# attrgetter("cycle")(context)). If any appear we assume the function reads everything.
+_DYNAMIC_ACCESS = {
+    "getattr", "getattr_static", "attrgetter", "vars", "__dict__", "__getattribute__", "__getattr__",
+    "__slots__", "__reduce__", "__reduce_ex__", "__getstate__", "eval", "exec", "compile",
+    "globals", "locals", "asdict", "astuple", "fields", "replace",
+}
+
+
+def _generated_functions(fn: FunctionType) -> Iterable[FunctionType]:
+    """
+    fn plus every function (or method) defined by the same generated code block. These share
+    fn's co_filename; framework helpers pulled in from GLOBALS_FOR_CODEGEN do not.
+    """
+    filename = fn.__code__.co_filename
+    yield fn
+    for value in fn.__globals__.values():
+        if isinstance(value, FunctionType) and value.__code__.co_filename == filename:
+            yield value
+        elif isinstance(value, type):
+            for attr in vars(value).values():
+                if isinstance(attr, FunctionType) and attr.__code__.co_filename == filename:
+                    yield attr
+
+
+def _code_names(code: CodeType) -> Set[str]:
+    """Attribute / global names and string constants used by code and every code object nested in it."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):  # nested functions, lambdas, comprehensions
+            names |= _code_names(const)
+        elif isinstance(const, str):  # e.g. a field name handed to an accessor we do not know
+            names.add(const)
+    return names
+
+
+def reads_context_field(fn: Any, field: str) -> bool:
+    """
+    Conservative static check of whether a generated function can read context.<field>.
+
+    Inspects the attribute names used by fn's code object (and by every other function defined in
+    the same generated code block, since fn may pass the context on to helpers). Returns True
+    whenever it cannot tell: for callables that are not plain Python functions, when any dynamic
+    attribute access appears (see _DYNAMIC_ACCESS), or when the field name appears as a string,
+    so an unknown access pattern is treated as reading the field.
+    """
+    if not isinstance(fn, FunctionType):
+        return True
+
+    names: Set[str] = set()
+    for f in _generated_functions(fn):
+        names |= _code_names(f.__code__)
+
+    if names & _DYNAMIC_ACCESS:
+        return True
+    return field in names
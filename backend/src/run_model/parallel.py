@@ -0,0 +1,160 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from backend.src.run_model.compile import flatten_parameters
+from backend.src.run_model.psa import ParameterDraws, evaluate_draws, sample_parameters, summarise_psa
+from backend.src.run_model.run_model import compile_bundle, model_settings
+
+# Per-process state, filled once by _init_worker so each worker compiles the bundle's code once.
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _init_worker(bundle: Dict[str, Any], parameter_names: List[str], discount_timing: str) -> None:
+    # GLOBALS_FOR_CODEGEN holds modules, so it is imported in the worker rather than pickled
+    from backend.src.run_model.run_model import GLOBALS_FOR_CODEGEN
+
+    _WORKER_STATE["compiled"] = compile_bundle(bundle=bundle, globals_ns=GLOBALS_FOR_CODEGEN)
+    _WORKER_STATE["settings"] = model_settings(bundle)
+    _WORKER_STATE["base_parameters"] = flatten_parameters(bundle["parameters"])
+    _WORKER_STATE["parameter_names"] = parameter_names
+    _WORKER_STATE["discount_timing"] = discount_timing
+
+
+def _run_chunk(start: int, values: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray]:
+    names = _WORKER_STATE["parameter_names"]
+    draws = ParameterDraws(names=names, values=values, sampled=names)
+    costs, qalys = evaluate_draws(
+        compiled=_WORKER_STATE["compiled"],
+        settings=_WORKER_STATE["settings"],
+        base_parameters=_WORKER_STATE["base_parameters"],
+        draws=draws,
+        rows=range(values.shape[0]),
+        discount_timing=_WORKER_STATE["discount_timing"],
+    )
+    return start, costs, qalys
+
+
+def run_iterations_parallel(
+    *,
+    bundle: Dict[str, Any],
+    draws: ParameterDraws,
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    discount_timing: str = "mid",
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fan the rows of draws out across a ProcessPoolExecutor. Each worker compiles the bundle once
+    (pool initializer); tasks carry only a slice of the sampled columns of the draw matrix and
+    return only discounted totals, shape (chunk, treatments).
+
+    on_progress(done, total) is called in the caller's process as chunks complete.
+    Returns discounted (costs, qalys), each (iterations, treatments), in draw order.
+    """
+    n = draws.n_draws
+    max_workers = max_workers or os.cpu_count() or 1
+    # a few chunks per worker keeps the pool busy without paying per-iteration IPC
+    chunk_size = chunk_size or max(1, -(-n // (max_workers * 4)))
+
+    n_treatments = len(bundle["treatments"])
+    # fixed parameters keep their base values (and types) in the workers
+    sampled_values = draws.values[:, [draws.names.index(name) for name in draws.sampled]]
+    costs = np.empty((n, n_treatments), dtype=float)
+    qalys = np.empty((n, n_treatments), dtype=float)
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(bundle, list(draws.sampled), discount_timing),
+    ) as pool:
+        futures = [
+            pool.submit(_run_chunk, start, sampled_values[start:start + chunk_size])
+            for start in range(0, n, chunk_size)
+        ]
+
+        done = 0
+        for future in as_completed(futures):
+            start, c, q = future.result()
+            costs[start:start + len(c)] = c
+            qalys[start:start + len(q)] = q
+            done += len(c)
+            if on_progress is not None:
+                on_progress(done, n)
+
+    return costs, qalys
+
+
+def run_psa_parallel(
+    *,
+    bundle: Dict[str, Any],
+    n_iterations: int,
+    seed: Optional[int] = None,
+    wtp_thresholds: Optional[Sequence[float]] = None,
+    discount_timing: str = "mid",
+    max_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Process-pool equivalent of psa.run_psa (same draws for the same seed)."""
+    draws = sample_parameters(bundle["parameters"], n_draws=n_iterations, seed=seed)
+
+    costs, qalys = run_iterations_parallel(
+        bundle=bundle,
+        draws=draws,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        discount_timing=discount_timing,
+        on_progress=on_progress,
+    )
+
+    return {
+        "draws": draws,
+        "treatments": bundle["treatments"],
+        "costs": costs,
+        "qalys": qalys,
+        **summarise_psa(treatments=bundle["treatments"], costs=costs, qalys=qalys,
+                        wtp_thresholds=wtp_thresholds),
+    }
+
+
+def run_scenarios_parallel(
+    *,
+    bundle: Dict[str, Any],
+    scenarios: List[Dict[str, float]],
+    discount_timing: str = "mid",
+    max_workers: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    scenarios: list of flat parameter overrides; parameters a scenario leaves out keep their
+    base-case value. Raises ValueError for a parameter the bundle does not define, or one that
+    a scenario would set from a non-numeric base value.
+    """
+    base = flatten_parameters(bundle["parameters"])
+    names = list(dict.fromkeys(name for s in scenarios for name in s))
+
+    unknown = [name for name in names if name not in base]
+    if unknown:
+        raise ValueError(f"Scenario parameters not in the bundle: {unknown}")
+    for i, s in enumerate(scenarios):
+        for name in names:
+            value = s.get(name, base[name])
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ValueError(f"Scenario {i}: parameter {name} needs a numeric value, got {value!r}")
+
+    values = np.array(
+        [[float(s.get(name, base.get(name))) for name in names] for s in scenarios],
+        dtype=float,
+    ).reshape(len(scenarios), len(names))
+
+    costs, qalys = run_iterations_parallel(
+        bundle=bundle,
+        draws=ParameterDraws(names=names, values=values, sampled=names),
+        max_workers=max_workers,
+        chunk_size=1,
+        discount_timing=discount_timing,
+        on_progress=on_progress,
+    )
+
+    return {"treatments": bundle["treatments"], "costs": costs, "qalys": qalys}
@@ -0,0 +1,310 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from backend.src.run_model.compile import flatten_parameters
+from backend.src.run_model.globals import classify_events
+from backend.src.run_model.invariance import reads_context_field
+from backend.src.run_model.runner import simulate_cohorts
+from backend.src.run_model.run_model import compile_bundle, model_settings
+
+SUPPORTED_DISTRIBUTIONS = ("beta", "gamma", "lognormal", "normal", "dirichlet")
+
+_DISTRIBUTION_ALIASES = {
+    "log-normal": "lognormal",
+    "log normal": "lognormal",
+    "gaussian": "normal",
+}
+
+DEFAULT_WTP_THRESHOLDS = np.linspace(0.0, 100_000.0, 101)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParameterDraws:
+    """
+    Columnar PSA draws: values[i, j] is the i-th draw of parameter names[j].
+    Parameters without a usable distribution are held fixed at their base value; skipped maps
+    parameters whose distribution could not be fitted (held fixed too) to the reason.
+    """
+    names: List[str]
+    values: np.ndarray
+    sampled: List[str]
+    skipped: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        index = {n: j for j, n in enumerate(self.names)}
+        self._sampled_columns = [(n, index[n]) for n in self.sampled]
+
+    @property
+    def n_draws(self) -> int:
+        return self.values.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.names.index(name)]
+
+    def parameters_for_draw(self, i: int, base: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Flat parameter dict for draw i: base with only the sampled parameters overridden, so fixed
+        parameters keep their original values and types (e.g. ints used as indices).
+        """
+        params = dict(base)
+        row = self.values[i]
+        for name, j in self._sampled_columns:
+            params[name] = float(row[j])
+        return params
+
+
+def _normalise_distribution(name: Any) -> Optional[str]:
+    if name is None:
+        return None
+    key = str(name).strip().lower()
+    key = _DISTRIBUTION_ALIASES.get(key, key)
+    # tolerate free text such as "Beta distribution" or "gamma (method of moments)"
+    for dist in sorted(SUPPORTED_DISTRIBUTIONS, key=len, reverse=True):
+        if key.startswith(dist):
+            return dist
+    return None
+
+
+def _sample_beta(rng, name: str, mean: float, se: float, n: int) -> np.ndarray:
+    var = se ** 2
+    if not 0.0 < mean < 1.0 or var >= mean * (1.0 - mean):
+        raise ValueError(f"Parameter {name}: beta needs 0 < value < 1 and se**2 < value*(1-value)")
+    k = mean * (1.0 - mean) / var - 1.0
+    return rng.beta(mean * k, (1.0 - mean) * k, size=n)
+
+
+def _sample_gamma(rng, name: str, mean: float, se: float, n: int) -> np.ndarray:
+    if mean <= 0.0:
+        raise ValueError(f"Parameter {name}: gamma needs value > 0")
+    var = se ** 2
+    return rng.gamma(mean ** 2 / var, var / mean, size=n)
+
+
+def _sample_lognormal(rng, name: str, mean: float, se: float, n: int) -> np.ndarray:
+    # value / standard_error describe the natural-scale mean and SE
+    if mean <= 0.0:
+        raise ValueError(f"Parameter {name}: lognormal needs value > 0")
+    sigma2 = np.log(1.0 + se ** 2 / mean ** 2)
+    return rng.lognormal(np.log(mean) - sigma2 / 2.0, np.sqrt(sigma2), size=n)
+
+
+def _sample_normal(rng, name: str, mean: float, se: float, n: int) -> np.ndarray:
+    return rng.normal(mean, se, size=n)
+
+
+_SAMPLERS = {
+    "beta": _sample_beta,
+    "gamma": _sample_gamma,
+    "lognormal": _sample_lognormal,
+    "normal": _sample_normal,
+}
+
+
+def _sample_dirichlet(rng, group: List[Tuple[str, float, Optional[float]]], n: int) -> Optional[np.ndarray]:
+    """
+    group: [(name, value, standard_error), ...] sharing one Dirichlet.
+    Values are read as proportions; the concentration is taken from the first member with an SE
+    (method of moments, as for beta). Returns None if no member has an SE (group held fixed).
+    """
+    values = np.array([v for _, v, _ in group], dtype=float)
+    if np.any(values <= 0.0):
+        raise ValueError(f"Dirichlet group {[g[0] for g in group]}: values must be > 0")
+    props = values / values.sum()
+
+    for (name, _, se), p in zip(group, props):
+        if se:
+            k = p * (1.0 - p) / se ** 2 - 1.0
+            if k <= 0.0:
+                raise ValueError(f"Parameter {name}: se too large for a Dirichlet proportion")
+            # keep the group's original scale (e.g. counts stay counts)
+            return rng.dirichlet(props * k, size=n) * values.sum()
+    return None
+
+
+def sample_parameters(
+    parameters_rich: Dict[str, Dict[str, Any]],
+    *,
+    n_draws: int,
+    seed: Optional[int] = None,
+) -> ParameterDraws:
+    """
+    Draw n_draws parameter sets from the rich parameter dict (value / distribution / standard_error),
+    using method-of-moments fits for beta, gamma, lognormal and normal.
+
+    Dirichlet parameters are sampled jointly per "group" key (all ungrouped Dirichlet parameters
+    form one group). Parameters with no recognised distribution, no standard_error or no numeric
+    value are held fixed, as are those whose inputs cannot be fitted (e.g. a beta SE too large
+    for its mean): these are reported and listed in ParameterDraws.skipped rather than aborting
+    the whole PSA.
+    """
+    rng = np.random.default_rng(seed)
+
+    names = list(parameters_rich.keys())
+    values = np.empty((n_draws, len(names)), dtype=float)
+    sampled: List[str] = []
+    skipped: Dict[str, str] = {}
+    dirichlet_groups: Dict[str, List[Tuple[str, float, Optional[float]]]] = {}
+
+    for j, name in enumerate(names):
+        p = parameters_rich[name]
+        value = p.get("value")
+        se = p.get("standard_error")
+        dist = _normalise_distribution(p.get("distribution"))
+
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            values[:, j] = np.nan
+            continue
+
+        if dist == "dirichlet":
+            dirichlet_groups.setdefault(str(p.get("group") or "dirichlet"), []).append((name, float(value), se))
+            values[:, j] = float(value)
+            continue
+
+        if dist is None or not se:
+            values[:, j] = float(value)
+            continue
+
+        try:
+            values[:, j] = _SAMPLERS[dist](rng, name, float(value), float(se), n_draws)
+        except ValueError as e:
+            logger.warning("PSA: holding %s fixed at %s: %s", name, value, e)
+            skipped[name] = str(e)
+            values[:, j] = float(value)
+            continue
+        sampled.append(name)
+
+    for group in dirichlet_groups.values():
+        try:
+            draws = _sample_dirichlet(rng, group, n_draws)
+        except ValueError as e:
+            logger.warning("PSA: holding Dirichlet group %s fixed: %s", [g[0] for g in group], e)
+            skipped.update({g[0]: str(e) for g in group})
+            continue
+        if draws is None:
+            continue
+        for k, (name, _, _) in enumerate(group):
+            values[:, names.index(name)] = draws[:, k]
+            sampled.append(name)
+
+    # non-numeric parameters are left to the base dict
+    numeric = ~np.isnan(values).all(axis=0) if n_draws else np.ones(len(names), dtype=bool)
+    return ParameterDraws(
+        names=[n for n, keep in zip(names, numeric) if keep],
+        values=values[:, numeric],
+        sampled=sampled,
+        skipped=skipped,
+    )
+
+
+def evaluate_draws(
+    *,
+    compiled: Dict[str, Any],
+    settings: Dict[str, Any],
+    base_parameters: Dict[str, Any],
+    draws: ParameterDraws,
+    rows: Sequence[int],
+    discount_timing: str = "mid",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run the model once per draw in rows. Returns discounted (costs, qalys), each (len(rows), treatments).
+    The static invariance analysis of the compiled code is done once, up front.
+    """
+    treatments = settings["treatments"]
+    time_homogeneous = not reads_context_field(compiled["build_transition_matrix_fn"], "cycle")
+    event_classes = classify_events(compiled["event_specs"])
+    costs = np.empty((len(rows), len(treatments)), dtype=float)
+    qalys = np.empty((len(rows), len(treatments)), dtype=float)
+
+    for r, i in enumerate(rows):
+        sim = simulate_cohorts(
+            **compiled,
+            **settings,
+            parameters=draws.parameters_for_draw(i, base_parameters),
+            discount_timing=discount_timing,
+            time_homogeneous=time_homogeneous,
+            event_classes=event_classes,
+        )
+        for k, trt in enumerate(treatments):
+            costs[r, k], qalys[r, k] = sim["accumulators"][trt].discounted_totals(
+                df_cost=sim["df_cost"], df_qaly=sim["df_qaly"],
+            )
+
+    return costs, qalys
+
+
+def summarise_psa(
+    *,
+    treatments: List[str],
+    costs: np.ndarray,
+    qalys: np.ndarray,
+    wtp_thresholds: Optional[Sequence[float]] = None,
+) -> Dict[str, Any]:
+    """
+    Incremental clouds (reference = first treatment, delta = reference - comparator, as in the
+    deterministic ICERs) and a CEAC: P(treatment has the highest net monetary benefit) per WTP.
+    """
+    wtp = np.asarray(DEFAULT_WTP_THRESHOLDS if wtp_thresholds is None else wtp_thresholds, dtype=float)
+
+    ref = treatments[0]
+    incremental = {
+        comp: {
+            "delta_cost": costs[:, 0] - costs[:, k],
+            "delta_qaly": qalys[:, 0] - qalys[:, k],
+        }
+        for k, comp in enumerate(treatments) if k > 0
+    }
+
+    # nmb: (wtp, iterations, treatments)
+    nmb = wtp[:, None, None] * qalys[None, :, :] - costs[None, :, :]
+    best = nmb.argmax(axis=2)
+    prob_ce = {trt: (best == k).mean(axis=1) for k, trt in enumerate(treatments)}
+
+    return {
+        "reference_treatment": ref,
+        "incremental": incremental,
+        "ceac": {"wtp": wtp, "prob_cost_effective": prob_ce},
+    }
+
+
+def run_psa(
+    *,
+    bundle: Dict[str, Any],
+    globals_ns: Dict[str, Any],
+    n_iterations: int,
+    seed: Optional[int] = None,
+    wtp_thresholds: Optional[Sequence[float]] = None,
+    discount_timing: str = "mid",
+) -> Dict[str, Any]:
+    """
+    Probabilistic sensitivity analysis over the bundle's parameter distributions.
+    The generated code is compiled once and only discounted totals are kept per iteration.
+
+    Returns:
+      - draws: ParameterDraws
+      - treatments: list[str]
+      - costs / qalys: arrays (iterations, treatments), discounted
+      - reference_treatment, incremental, ceac (see summarise_psa)
+    """
+    draws = sample_parameters(bundle["parameters"], n_draws=n_iterations, seed=seed)
+
+    settings = model_settings(bundle)
+    costs, qalys = evaluate_draws(
+        compiled=compile_bundle(bundle=bundle, globals_ns=globals_ns),
+        settings=settings,
+        base_parameters=flatten_parameters(bundle["parameters"]),
+        draws=draws,
+        rows=range(n_iterations),
+        discount_timing=discount_timing,
+    )
+
+    return {
+        "draws": draws,
+        "treatments": settings["treatments"],
+        "costs": costs,
+        "qalys": qalys,
+        **summarise_psa(treatments=settings["treatments"], costs=costs, qalys=qalys,
+                        wtp_thresholds=wtp_thresholds),
+    }
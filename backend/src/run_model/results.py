@@ -0,0 +1,383 @@
+import io
+import json
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import numpy as np
+
+DISCOUNTING = ("undiscounted", "discounted")
+
+
+class LazyDict(Mapping):
+    """
+    Read-only mapping whose values are produced by zero-argument callables on first access and
+    memoized. materialise() converts it (recursively) to plain dicts, e.g. for JSON.
+    """
+
+    def __init__(self, thunks: Dict[str, Callable[[], Any]]):
+        self._thunks = thunks
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            self._values[key] = self._thunks[key]()
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._thunks)
+
+    def __len__(self) -> int:
+        return len(self._thunks)
+
+    def materialise(self) -> Dict[str, Any]:
+        return {k: _materialise(v) for k, v in self.items()}
+
+
+def _materialise(value: Any) -> Any:
+    if isinstance(value, LazyDict):
+        return value.materialise()
+    return value
+
+
+class MarkovResults:
+    """
+    Columnar model results backed by NumPy arrays with labelled axes.
+
+    Stored arrays (undiscounted; discounting is applied from the per-cycle factors on access):
+      - costs, qalys: (treatment, cycle, state, event)
+      - occupancy: (treatment, cycle + 1, state)
+      - df_cost, df_qaly, correction: (cycle,)
+
+    outcome(...) returns the (treatment, discounting, cycle, state, event) view with both
+    discounting variants; to_legacy_dict() expands everything to the nested-dict shape
+    run_markov_model has always returned; to_bytes()/from_bytes() give a compact binary form.
+
+    Aggregations (total, by_state, by_event, by_state_event, by_cycle, cumulative_by_cycle,
+    by_year_band) are computed on first access and memoized, as is every part of legacy_view().
+    """
+
+    def __init__(
+        self,
+        *,
+        treatments: List[str],
+        health_states: List[str],
+        event_names: List[str],
+        settings: Dict[str, Any],
+        costs: np.ndarray,
+        qalys: np.ndarray,
+        occupancy: np.ndarray,
+        df_cost: np.ndarray,
+        df_qaly: np.ndarray,
+        correction: Optional[np.ndarray] = None,
+        legacy_event_names: Optional[List[str]] = None,
+    ):
+        self.treatments = list(treatments)
+        self.health_states = list(health_states)
+        self.event_names = list(event_names)
+        # the enabled event names as the model defined them, in order and with any duplicates
+        # (event_names is the unique column labels); reported unchanged by legacy_view()
+        self.legacy_event_names = list(event_names if legacy_event_names is None else legacy_event_names)
+        self.settings = settings
+        self.costs = costs
+        self.qalys = qalys
+        self.occupancy = occupancy
+        self.df_cost = df_cost
+        self.df_qaly = df_qaly
+        # half-cycle correction weights (already applied to costs / qalys, applied to time spent on access)
+        self.correction = np.ones(costs.shape[1]) if correction is None else correction
+        self._memo: Dict[Any, Any] = {}
+
+    @classmethod
+    def from_simulation(cls, sim: Dict[str, Any], *, treatments: List[str], settings: Dict[str, Any]) -> "MarkovResults":
+        """Build from the dict returned by runner.simulate_cohorts."""
+        accumulators = [sim["accumulators"][trt] for trt in treatments]
+        n_cycles = sim["n_cycles"]
+        n_states = len(settings["health_states"])
+        event_names = list(dict.fromkeys(sim["event_names"]))
+        shape = (len(treatments), n_cycles, n_states, len(event_names))
+
+        return cls(
+            treatments=treatments,
+            health_states=settings["health_states"],
+            event_names=event_names,
+            settings=settings,
+            costs=np.stack([a.costs for a in accumulators]) if accumulators else np.zeros(shape),
+            qalys=np.stack([a.qalys for a in accumulators]) if accumulators else np.zeros(shape),
+            occupancy=sim["occupancy"],
+            df_cost=sim["df_cost"],
+            df_qaly=sim["df_qaly"],
+            correction=sim.get("correction"),
+            legacy_event_names=sim["event_names"],
+        )
+
+    # -------------------------
+    # Labelled access
+    # -------------------------
+
+    @property
+    def n_cycles(self) -> int:
+        return self.costs.shape[1]
+
+    @property
+    def axes(self) -> Dict[str, List[Any]]:
+        return {
+            "treatment": self.treatments,
+            "discounting": list(DISCOUNTING),
+            "cycle": list(range(self.n_cycles)),
+            "state": self.health_states,
+            "event": self.event_names,
+        }
+
+    def outcome(self, kind: str) -> np.ndarray:
+        """kind: "costs" or "qalys". Returns (treatment, discounting, cycle, state, event)."""
+        arr, factors = (self.costs, self.df_cost) if kind == "costs" else (self.qalys, self.df_qaly)
+        return np.stack([arr, arr * factors[None, :, None, None]], axis=1)
+
+    def time_spent(self) -> np.ndarray:
+        """Life-years per cycle, (treatment, cycle, state). Not discounted."""
+        return (
+            self.occupancy[:, :self.n_cycles]
+            * self.settings["cycle_length_years"]
+            * self.correction[None, :, None]
+        )
+
+    # -------------------------
+    # Binary form
+    # -------------------------
+
+    def to_bytes(self, *, compress: bool = True) -> bytes:
+        meta = {
+            "treatments": self.treatments,
+            "health_states": self.health_states,
+            "event_names": self.event_names,
+            "legacy_event_names": self.legacy_event_names,
+            "settings": self.settings,
+        }
+        buf = io.BytesIO()
+        save = np.savez_compressed if compress else np.savez
+        save(
+            buf,
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+            costs=self.costs,
+            qalys=self.qalys,
+            occupancy=self.occupancy,
+            df_cost=self.df_cost,
+            df_qaly=self.df_qaly,
+            correction=self.correction,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MarkovResults":
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            meta = json.loads(npz["meta"].tobytes().decode("utf-8"))
+            return cls(
+                **meta,
+                costs=npz["costs"],
+                qalys=npz["qalys"],
+                occupancy=npz["occupancy"],
+                df_cost=npz["df_cost"],
+                df_qaly=npz["df_qaly"],
+                correction=npz["correction"] if "correction" in npz.files else None,
+            )
+
+    # -------------------------
+    # Lazy aggregations
+    # -------------------------
+
+    def _memoized(self, key: Any, compute: Callable[[], Any]) -> Any:
+        if key not in self._memo:
+            value = compute()
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)  # shared between callers
+            self._memo[key] = value
+        return self._memo[key]
+
+    def _trt_index(self, treatment: str) -> int:
+        return self.treatments.index(treatment)
+
+    def _cube(self, kind: str, k: int, discounted: bool) -> np.ndarray:
+        """(cycle, state, event) array for one treatment."""
+        if kind not in ("costs", "qalys"):
+            raise ValueError("kind must be 'costs' or 'qalys'")
+        arr, factors = (self.costs[k], self.df_cost) if kind == "costs" else (self.qalys[k], self.df_qaly)
+        if not discounted:
+            return arr
+        return self._memoized(("cube", kind, k), lambda: arr * factors[:, None, None])
+
+    def by_cycle(self, kind: str, treatment: str, *, discounted: bool = True) -> np.ndarray:
+        """Per-cycle totals, shape (cycle,)."""
+        k = self._trt_index(treatment)
+        return self._memoized(
+            ("by_cycle", kind, k, discounted),
+            lambda: self._cube(kind, k, discounted).sum(axis=(1, 2)),
+        )
+
+    def cumulative_by_cycle(self, kind: str, treatment: str, *, discounted: bool = True) -> np.ndarray:
+        k = self._trt_index(treatment)
+        return self._memoized(
+            ("cumulative", kind, k, discounted),
+            lambda: np.cumsum(self.by_cycle(kind, treatment, discounted=discounted)),
+        )
+
+    def total(self, kind: str, treatment: str, *, discounted: bool = True) -> float:
+        k = self._trt_index(treatment)
+        return self._memoized(
+            ("total", kind, k, discounted),
+            lambda: float(self.by_cycle(kind, treatment, discounted=discounted).sum()),
+        )
+
+    def _state_event(self, kind: str, k: int, discounted: bool) -> np.ndarray:
+        return self._memoized(
+            ("state_event", kind, k, discounted),
+            lambda: self._cube(kind, k, discounted).sum(axis=0),
+        )
+
+    # The dict-returning aggregations hand out copies of the memoized values, so a caller that
+    # modifies its result cannot change what later reads (or the legacy view) see.
+
+    def by_state_event(self, kind: str, treatment: str, *, discounted: bool = True) -> Dict[str, Dict[str, float]]:
+        k = self._trt_index(treatment)
+        memo = self._memoized(
+            ("by_state_event", kind, k, discounted),
+            lambda: self._state_event_dict(self._state_event(kind, k, discounted)),
+        )
+        return {st: dict(row) for st, row in memo.items()}
+
+    def by_state(self, kind: str, treatment: str, *, discounted: bool = True) -> Dict[str, float]:
+        k = self._trt_index(treatment)
+        return dict(self._memoized(
+            ("by_state", kind, k, discounted),
+            lambda: dict(zip(self.health_states, self._state_event(kind, k, discounted).sum(axis=1).tolist())),
+        ))
+
+    def by_event(self, kind: str, treatment: str, *, discounted: bool = True) -> Dict[str, float]:
+        k = self._trt_index(treatment)
+        return dict(self._memoized(
+            ("by_event", kind, k, discounted),
+            lambda: dict(zip(self.event_names, self._state_event(kind, k, discounted).sum(axis=0).tolist())),
+        ))
+
+    def by_year_band(
+        self, kind: str, treatment: str, *, band_years: float = 1.0, discounted: bool = True,
+    ) -> Dict[float, float]:
+        """Totals grouped by the year band each cycle starts in: {band start (years): value}."""
+        k = self._trt_index(treatment)
+
+        def compute() -> Dict[float, float]:
+            starts = np.arange(self.n_cycles) * self.settings["cycle_length_years"]
+            # small tolerance so e.g. 12 monthly cycles land exactly in one band
+            band = np.floor(starts / band_years + 1e-9).astype(int)
+            sums = np.bincount(band, weights=self.by_cycle(kind, treatment, discounted=discounted))
+            return {float(b * band_years): float(v) for b, v in enumerate(sums.tolist())}
+
+        return dict(self._memoized(("by_year_band", kind, k, band_years, discounted), compute))
+
+    def time_spent_by_state(self, treatment: str) -> Dict[str, float]:
+        k = self._trt_index(treatment)
+        return dict(self._memoized(
+            ("time_spent_by_state", k),
+            lambda: dict(zip(self.health_states, self.time_spent()[k].sum(axis=0).tolist())),
+        ))
+
+    # -------------------------
+    # Legacy dict shape
+    # -------------------------
+
+    def _state_event_dict(self, arr: np.ndarray) -> Dict[str, Dict[str, float]]:
+        return {
+            st: dict(zip(self.event_names, row.tolist()))
+            for st, row in zip(self.health_states, arr)
+        }
+
+    def _totals_view(self, k: int, discounted: bool) -> LazyDict:
+        trt = self.treatments[k]
+        return LazyDict({
+            "cost_total": lambda: self.total("costs", trt, discounted=discounted),
+            "qaly_total": lambda: self.total("qalys", trt, discounted=discounted),
+            "cost_by_event": lambda: self.by_event("costs", trt, discounted=discounted),
+            "qaly_by_event": lambda: self.by_event("qalys", trt, discounted=discounted),
+            "cost_by_state": lambda: self.by_state("costs", trt, discounted=discounted),
+            "qaly_by_state": lambda: self.by_state("qalys", trt, discounted=discounted),
+            "cost_by_state_event": lambda: self.by_state_event("costs", trt, discounted=discounted),
+            "qaly_by_state_event": lambda: self.by_state_event("qalys", trt, discounted=discounted),
+        })
+
+    def _outcomes_view(self, k: int, discounted: bool) -> LazyDict:
+        return LazyDict({
+            "costs_per_cycle_state_event": lambda: [
+                self._state_event_dict(c) for c in self._cube("costs", k, discounted)
+            ],
+            "qalys_per_cycle_state_event": lambda: [
+                self._state_event_dict(q) for q in self._cube("qalys", k, discounted)
+            ],
+            "totals": lambda: self._totals_view(k, discounted),
+        })
+
+    def _time_spent_view(self, k: int) -> LazyDict:
+        trt = self.treatments[k]
+        return LazyDict({
+            "time_spent_per_cycle_state": lambda: [
+                dict(zip(self.health_states, row)) for row in self.time_spent()[k].tolist()
+            ],
+            "totals": lambda: LazyDict({
+                "time_spent_total": lambda: float(self.time_spent()[k].sum()),
+                # a fresh copy each time: the discounted and undiscounted views must not share a dict
+                "time_spent_by_state": lambda: self.time_spent_by_state(trt),
+            }),
+        })
+
+    def _treatment_view(self, k: int) -> LazyDict:
+        return LazyDict({
+            "outcomes": lambda: LazyDict({
+                "undiscounted": lambda: self._outcomes_view(k, False),
+                "discounted": lambda: self._outcomes_view(k, True),
+            }),
+            "occupancy": lambda: LazyDict({
+                "occupancy_by_cycle": lambda: [
+                    dict(zip(self.health_states, row)) for row in self.occupancy[k].tolist()
+                ],
+                # time spent is not discounted; both keys carry the same values
+                "undiscounted": lambda: self._time_spent_view(k),
+                "discounted": lambda: self._time_spent_view(k),
+            }),
+        })
+
+    def _icers(self, discounted: bool) -> Dict[str, Any]:
+        ref = self.treatments[0]
+        ref_cost = self.total("costs", ref, discounted=discounted)
+        ref_qaly = self.total("qalys", ref, discounted=discounted)
+        comps = []
+        for comp in self.treatments[1:]:
+            d_cost = ref_cost - self.total("costs", comp, discounted=discounted)
+            d_qaly = ref_qaly - self.total("qalys", comp, discounted=discounted)
+            icer = None if abs(d_qaly) < 1e-12 else d_cost / d_qaly
+            comps.append({
+                "comparator": comp,
+                "delta_cost": d_cost,
+                "delta_qaly": d_qaly,
+                "icer": icer,
+            })
+        return {"reference_treatment": ref, "comparisons": comps}
+
+    def legacy_view(self) -> LazyDict:
+        """
+        The nested dict structure historically returned by run_markov_model, as LazyDicts: each
+        breakdown is only built when it is first read.
+        """
+        return LazyDict({
+            "settings": lambda: self.settings,
+            "event_names": lambda: self.legacy_event_names,
+            "treatments": lambda: self.treatments,
+            "per_treatment": lambda: LazyDict({
+                trt: (lambda k=k: self._treatment_view(k)) for k, trt in enumerate(self.treatments)
+            }),
+            "icer": lambda: {
+                "discounted": self._icers(True),
+                "undiscounted": self._icers(False),
+                "note": "ICERs computed for both discounted and undiscounted totals",
+            },
+        })
+
+    def to_legacy_dict(self) -> Dict[str, Any]:
+        """Fully materialised legacy_view()."""
+        return self.legacy_view().materialise()
@@ -2,9 +2,10 @@ import numpy as np
 from backend.src.run_model.globals import (TransitionMatrixContext, EventSpec,
                                            initialise_impact, NamedTransitionMatrix, EventContext, EventImpact)
 import math
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Union
+from backend.src.run_model.results import MarkovResults
 from backend.src.run_model.compile import flatten_parameters, compile_transition_fn, compile_event_specs
-from backend.src.run_model.runner import run_markov_model
+from backend.src.run_model.runner import run_markov_model, run_markov_model_columnar
 from backend.src.file_management.load_snapshot import load_model_bundle_snapshot
 from backend.files.file_paths import snapshot_dir
 
@@ -22,13 +23,72 @@ GLOBALS_FOR_CODEGEN = {
 }
 
 
+def compile_bundle(
+    *,
+    bundle: Dict[str, Any],
+    globals_ns: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Compile the bundle's generated code into runtime objects:
+      - build_transition_matrix_fn: get_transition_matrix(context)
+      - event_specs: list[EventSpec]
+    """
+    build_transition_matrix_fn = compile_transition_fn(transition_code=bundle["transition_matrix_code"],
+                                                       globals_ns=globals_ns)
+
+    event_specs = compile_event_specs(events_code=[e["final_code"] for e in bundle["events"]],
+        globals_ns=globals_ns,
+    )
+
+    return {"build_transition_matrix_fn": build_transition_matrix_fn, "event_specs": event_specs}
+
+
+def model_settings(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """The non-code runner inputs carried by a bundle."""
+    return {
+        "health_states": bundle["health_states"],
+        "treatments": bundle["treatments"],
+        "cycle_length_years": bundle["cycle_length_years"],
+        "time_horizon_years": bundle["time_horizon_years"],
+        "disc_rate_cost_annual": bundle["disc_rate_cost_annual"],
+        "disc_rate_qaly_annual": bundle["disc_rate_qaly_annual"],
+        "initial_occupancy": bundle["initial_occupancy"],
+    }
+
+
+def runnable_bundle(bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The runner's bundle shape (transition_matrix_code / events) from a generated bundle
+    (transition_matrix_data / event_data); disabled events are left out. Runner-shaped bundles
+    are returned as they are.
+    """
+    if "transition_matrix_code" in bundle:
+        return bundle
+    return {
+        **bundle,
+        "transition_matrix_code": bundle["transition_matrix_data"]["final_code"],
+        "events": [
+            {"event_name": e["event_name"], "final_code": e["final_code"]}
+            for e in bundle["event_data"]
+            if (e.get("metadata") or {}).get("enabled", True) is not False
+        ],
+    }
+
+
 def run_model_from_bundle(
     *,
     bundle: Dict[str, Any],
     globals_ns: Dict[str, Any],
     discount_timing: str = "mid",
-) -> Dict[str, Any]:
+    batch_treatments: bool = False,
+    time_homogeneous: Optional[bool] = None,
+    hoist_invariant_events: bool = True,
+    half_cycle_correction: Optional[str] = None,
+    columnar: bool = False,
+) -> Union[Dict[str, Any], MarkovResults]:
     """
+    columnar: return a MarkovResults (NumPy-backed, see results.py) instead of the legacy dict.
+
     bundle must contain:
       - transition_matrix_code: str (defines get_transition_matrix)
       - events: list[{final_code: str, event_name: str}, ...]
@@ -40,31 +100,42 @@ def run_model_from_bundle(
     parameters = flatten_parameters(bundle["parameters"])
 
     # 3) compile code to runtime objects
-    build_transition_matrix_fn = compile_transition_fn(transition_code=bundle["transition_matrix_code"],
-                                                       globals_ns=globals_ns)
-
-    event_specs = compile_event_specs(events_code=[e["final_code"] for e in bundle["events"]],
-        globals_ns=globals_ns,
-    )
+    compiled = compile_bundle(bundle=bundle, globals_ns=globals_ns)
 
     # 4) run
-    results = run_markov_model(
-        build_transition_matrix_fn=build_transition_matrix_fn,
-        event_specs=event_specs,
+    run = run_markov_model_columnar if columnar else run_markov_model
+    results = run(
+        **compiled,
+        **model_settings(bundle),
         parameters=parameters,
-        health_states=bundle["health_states"],
-        treatments=bundle["treatments"],
-        cycle_length_years=bundle["cycle_length_years"],
-        time_horizon_years=bundle["time_horizon_years"],
-        disc_rate_cost_annual=bundle["disc_rate_cost_annual"],
-        disc_rate_qaly_annual =bundle["disc_rate_qaly_annual"],
-        initial_occupancy=bundle["initial_occupancy"],
         discount_timing=discount_timing,
+        batch_treatments=batch_treatments,
+        time_homogeneous=time_homogeneous,
+        hoist_invariant_events=hoist_invariant_events,
+        half_cycle_correction=half_cycle_correction,
     )
 
     return results
 
 
+def run_model_from_snapshot(
+    *,
+    snapshot_dir: str,
+    half_cycle_correction: Optional[str] = None,
+) -> MarkovResults:
+    """
+    Load a saved (or working) model from disk and run it, returning MarkovResults. Module-level
+    and taking only plain arguments so it can run in a worker process.
+    """
+    bundle = runnable_bundle(load_model_bundle_snapshot(snapshot_dir=snapshot_dir))
+    return run_model_from_bundle(
+        bundle=bundle,
+        globals_ns=GLOBALS_FOR_CODEGEN,
+        half_cycle_correction=half_cycle_correction,
+        columnar=True,
+    )
+
+
 if __name__ == "__main__":
 
     model_bundle = load_model_bundle_snapshot(snapshot_dir=snapshot_dir)
@@ -1,8 +1,34 @@
-from typing import Callable, List, Dict, Any
-from backend.src.run_model.globals import TransitionMatrixContext, EventSpec, validate_transition_matrix, compile_impacts
+from typing import Callable, List, Dict, Any, Optional
+from backend.src.run_model.globals import (TransitionMatrixContext, EventSpec, validate_transition_matrix,
+                                           compile_impacts, ImpactCache, EVENT_CYCLE_DEPENDENT)
+from backend.src.run_model.accumulate import OutcomeAccumulator
+from backend.src.run_model.results import MarkovResults
+from backend.src.run_model.discounting import discount_schedule
+from backend.src.run_model.invariance import reads_context_field
 import numpy as np
 
-def run_markov_model(
+
+def propagate_time_homogeneous(s0: np.ndarray, P: np.ndarray, n_cycles: int) -> np.ndarray:
+    """
+    Occupancy for cycles 0..n_cycles under a constant transition matrix, shape (n_cycles + 1, states).
+    Uses repeated squaring: once rows [0, m) are known, rows [m, 2m) are rows [0, m) @ P^m, so
+    only O(log n_cycles) matrix products are needed.
+    """
+    s_by_cycle = np.empty((n_cycles + 1, len(s0)), dtype=float)
+    s_by_cycle[0] = s0
+
+    m = 1
+    P_m = P
+    while m <= n_cycles:
+        end = min(2 * m, n_cycles + 1)
+        s_by_cycle[m:end] = s_by_cycle[:end - m] @ P_m
+        P_m = P_m @ P_m
+        m *= 2
+
+    return s_by_cycle
+
+
+def simulate_cohorts(
     *,
     build_transition_matrix_fn: Callable[[TransitionMatrixContext], np.ndarray],
     event_specs: List[EventSpec],
@@ -15,296 +41,303 @@ def run_markov_model(
     disc_rate_qaly_annual: float,
     initial_occupancy: Dict[str, Any],
     discount_timing: str = "mid",
-
+    batch_treatments: bool = False,
+    time_homogeneous: Optional[bool] = None,
+    hoist_invariant_events: bool = True,
+    half_cycle_correction: Optional[str] = None,
+    event_classes: Optional[Dict[int, str]] = None,
 ) -> Dict[str, Any]:
-
-    idx = {s: i for i, s in enumerate(health_states)}
+    """
+    Array core of the runner: propagates every treatment arm and accumulates outcomes, without
+    expanding anything into per-cycle dicts.
+
+    batch_treatments: propagate all treatment arms together each cycle, holding occupancy as a
+    (treatments, states) matrix and transitions as a (treatments, states, states) tensor. Results
+    are the same as the per-treatment loop.
+
+    time_homogeneous: if the transition matrix does not depend on the cycle, build and validate it
+    once per treatment and propagate occupancy by repeated squaring. None (default) decides by
+    static analysis of build_transition_matrix_fn (see invariance.reads_context_field). Takes
+    precedence over batch_treatments.
+
+    hoist_invariant_events: evaluate events that do not read context.cycle once (per treatment if
+    they read context.treatment) and reuse their impact arrays every cycle (see globals.ImpactCache).
+    event_classes: precomputed globals.classify_events(event_specs); callers running the same
+    compiled model many times pass it (and time_homogeneous) to do the static analysis once.
+
+    half_cycle_correction: None, "first" or "trapezoidal" (see discounting.half_cycle_weights).
+    Discount factors and correction weights come from the cached discounting.discount_schedule.
+
+    Returns:
+      - event_names: list[str]
+      - n_cycles: int
+      - occupancy: array (treatments, cycles + 1, states)
+      - accumulators: dict[treatment] -> OutcomeAccumulator
+      - df_cost / df_qaly: per-cycle discount factors, shape (cycles,)
+      - correction: per-cycle half-cycle correction weights, shape (cycles,), already applied to
+        the accumulators
+    """
 
     event_names = [e.event_name for e in event_specs if e.enabled]
 
     n_cycles = int(time_horizon_years / cycle_length_years)
 
-    # -------------------------
-    # Helpers
-    # -------------------------
-
-    def time_at_cycle_years(cycle: int) -> float:
-        if discount_timing == "start":
-            return cycle * cycle_length_years
-        if discount_timing == "mid":
-            return (cycle + 0.5) * cycle_length_years
-        if discount_timing == "end":
-            return (cycle + 1.0) * cycle_length_years
-        raise ValueError("discount_timing must be 'start', 'mid', or 'end'")
-
-    def df(rate_annual: float, t_years: float) -> float:
-        return 1.0 / ((1.0 + rate_annual) ** t_years)
-
-    def zeros_event_dict() -> Dict[str, float]:
-        return {ename: 0.0 for ename in event_names}
-
-    def zeros_state_dict() -> Dict[str, float]:
-        return {s: 0.0 for s in health_states}
-
-    # -------------------------
-    # Results container
-    # -------------------------
-
-    results = {
-        "settings": {
-            "health_states": health_states,
-            "cycle_length_years": cycle_length_years,
-            "time_horizon_years": time_horizon_years,
-            "discount_timing": discount_timing,
-            "disc_rate_cost_annual": disc_rate_cost_annual,
-            "discount_rate_qaly_annual": disc_rate_qaly_annual,
-            "initial_occupancy": initial_occupancy,
-        },
-        "event_names": event_names,
-        "treatments": treatments,
-        "per_treatment": {},
-        "icer": None,
+    schedule = discount_schedule(
+        n_cycles=n_cycles,
+        cycle_length_years=cycle_length_years,
+        disc_rate_cost_annual=disc_rate_cost_annual,
+        disc_rate_qaly_annual=disc_rate_qaly_annual,
+        discount_timing=discount_timing,
+        half_cycle_correction=half_cycle_correction,
+    )
+    df_cost, df_qaly = schedule.cost, schedule.qaly
+
+    def transition_matrix(trt: str, cycle: int) -> np.ndarray:
+        tm_ctx = TransitionMatrixContext(
+            cycle=cycle,
+            treatment=trt,
+            params=parameters,
+            health_states=health_states,
+            cycle_length_years=cycle_length_years,
+            time_horizon_years=time_horizon_years,
+        )
+        return validate_transition_matrix(build_transition_matrix_fn(tm_ctx))
+
+    impact_cache = ImpactCache(event_classes) if hoist_invariant_events else None
+
+    def event_impacts(trt: str, cycle: int, specs: List[EventSpec] = event_specs,
+                      cache: Optional[ImpactCache] = impact_cache) -> Dict[str, Any]:
+        impacts = compile_impacts(
+            health_states=health_states,
+            treatment=trt,
+            cycle=cycle,
+            params=parameters,
+            event_specs=specs,
+            cycle_length_years=cycle_length_years,
+            time_horizon_years=time_horizon_years,
+            impact_cache=cache,
+        )
+        return impacts["per_event_impacts"]
+
+    # ---- occupancy, shape (treatments, cycles + 1, states) ----
+    s_by_cycle = np.zeros((len(treatments), n_cycles + 1, len(health_states)), dtype=float)
+    for k, trt in enumerate(treatments):
+        s_by_cycle[k, 0] = [float(initial_occupancy[trt].get(s, 0.0)) for s in health_states]
+
+    accumulators = {
+        trt: OutcomeAccumulator(n_cycles=n_cycles, health_states=health_states, event_names=event_names)
+        for trt in treatments
     }
 
-    totals_for_icer = {}
+    if time_homogeneous is None:
+        time_homogeneous = not reads_context_field(build_transition_matrix_fn, "cycle")
 
-    # =========================
-    # MAIN LOOP (by treatment)
-    # =========================
+    if time_homogeneous:
 
-    for trt in treatments:
+        # =========================
+        # CYCLE-INVARIANT TRANSITIONS
+        # =========================
 
-        # ---- occupancy vectors ----
-        s_by_cycle: List[np.ndarray] = []
-        s0 = np.array(
-            [float(initial_occupancy[trt].get(s, 0.0)) for s in health_states],
-            dtype=float,
-        )
-        s_by_cycle.append(s0)
-
-        # ---- cubes ----
-        cost_cse_u, qaly_cse_u = [], []
-        cost_cse_d, qaly_cse_d = [], []
-        ts_cs_u, ts_cs_d = [], []
-
-        totals = {
-            "undiscounted": {
-                "cost_total": 0.0,
-                "qaly_total": 0.0,
-                "cost_by_event": zeros_event_dict(),
-                "qaly_by_event": zeros_event_dict(),
-                "cost_by_state": zeros_state_dict(),
-                "qaly_by_state": zeros_state_dict(),
-                "cost_by_state_event": {s: zeros_event_dict() for s in health_states},
-                "qaly_by_state_event": {s: zeros_event_dict() for s in health_states},
-            },
-            "discounted": {
-                "cost_total": 0.0,
-                "qaly_total": 0.0,
-                "cost_by_event": zeros_event_dict(),
-                "qaly_by_event": zeros_event_dict(),
-                "cost_by_state": zeros_state_dict(),
-                "qaly_by_state": zeros_state_dict(),
-                "cost_by_state_event": {s: zeros_event_dict() for s in health_states},
-                "qaly_by_state_event": {s: zeros_event_dict() for s in health_states},
-            },
-        }
-
-        ts_totals = {
-            "undiscounted": {"time_spent_total": 0.0, "time_spent_by_state": zeros_state_dict()},
-            "discounted": {"time_spent_total": 0.0, "time_spent_by_state": zeros_state_dict()},
-        }
+        # with hoisting, cycle-invariant events are recorded for all cycles in one pass and only
+        # cycle-dependent events are evaluated per cycle (without the cache: nothing to reuse)
+        if impact_cache is not None:
+            per_cycle_specs = [e for e in event_specs if impact_cache.classify(e) == EVENT_CYCLE_DEPENDENT]
+            hoisted_specs = [e for e in event_specs if impact_cache.classify(e) != EVENT_CYCLE_DEPENDENT]
+        else:
+            per_cycle_specs, hoisted_specs = event_specs, []
+
+        for k, trt in enumerate(treatments):
+
+            P = transition_matrix(trt, 0)
+            s_by_cycle[k] = propagate_time_homogeneous(s_by_cycle[k, 0], P, n_cycles)
+
+            if hoisted_specs:
+                accumulators[trt].record_cycles(
+                    s=s_by_cycle[k, :n_cycles],
+                    P=P,
+                    per_event_impacts=event_impacts(trt, 0, hoisted_specs),
+                )
+
+            if not per_cycle_specs:
+                continue
+
+            for cycle in range(n_cycles):
+
+                s_t = s_by_cycle[k, cycle]
+
+                accumulators[trt].record(
+                    cycle=cycle,
+                    s_t=s_t,
+                    F_t=s_t[:, None] * P,
+                    per_event_impacts=event_impacts(trt, cycle, per_cycle_specs, None),
+                )
+
+    elif batch_treatments:
 
         # =========================
-        # CYCLE LOOP
+        # CYCLE LOOP (all treatments at once)
         # =========================
 
+        P = np.empty((len(treatments), len(health_states), len(health_states)), dtype=float)
+
         for cycle in range(n_cycles):
 
-            s_t = s_by_cycle[cycle]
-            t_years = time_at_cycle_years(cycle)
-            df_cost = df(disc_rate_cost_annual, t_years)
-            df_qaly = df(disc_rate_qaly_annual, t_years)
-
-            # ---- time spent ----
-            ts_u, ts_d = {}, {}
-            for i, st in enumerate(health_states):
-                ly = float(s_t[i]) * cycle_length_years
-                ts_u[st] = ly
-                ts_d[st] = ly
-
-                ts_totals["undiscounted"]["time_spent_by_state"][st] += ly
-                ts_totals["undiscounted"]["time_spent_total"] += ly
-                ts_totals["discounted"]["time_spent_by_state"][st] += ly
-                ts_totals["discounted"]["time_spent_total"] += ly
-
-            ts_cs_u.append(ts_u)
-            ts_cs_d.append(ts_d)
-
-            # ---- transition matrix ----
-            tm_ctx = TransitionMatrixContext(
-                cycle=cycle,
-                treatment=trt,
-                params=parameters,
-                health_states=health_states,
-                cycle_length_years=cycle_length_years,
-                time_horizon_years=time_horizon_years,
-            )
-
-            P_t = validate_transition_matrix(
-                build_transition_matrix_fn(tm_ctx)
-            )
-
-            F_t = np.diag(s_t) @ P_t
-
-            # ---- accruals ----
-            impacts = compile_impacts(
-                health_states=health_states,
-                treatment=trt,
-                cycle=cycle,
-                params=parameters,
-                event_specs=event_specs,
-                cycle_length_years=cycle_length_years,
-                time_horizon_years=time_horizon_years,
-            )
-
-            per_event = impacts["per_event_impacts"]
-
-            cost_state_event_u = {s: zeros_event_dict() for s in health_states}
-            qaly_state_event_u = {s: zeros_event_dict() for s in health_states}
-            cost_state_event_d = {s: zeros_event_dict() for s in health_states}
-            qaly_state_event_d = {s: zeros_event_dict() for s in health_states}
-
-            for ename, contrib in per_event.items():
-
-                c_occ = contrib.cost_occupation.as_array()
-                u_occ = contrib.qaly_occupation.as_array()
-                C_flow = contrib.cost_flow.as_array()
-                U_flow = contrib.qaly_flow.as_array()
-
-                # ---- occupancy effects ----
-                for i, st in enumerate(health_states):
-                    c_u = s_t[i] * c_occ[i]
-                    q_u = s_t[i] * u_occ[i]
-
-                    cost_state_event_u[st][ename] += c_u
-                    qaly_state_event_u[st][ename] += q_u
-                    cost_state_event_d[st][ename] += c_u * df_cost
-                    qaly_state_event_d[st][ename] += q_u * df_qaly
-
-                    totals["undiscounted"]["cost_total"] += c_u
-                    totals["undiscounted"]["qaly_total"] += q_u
-                    totals["undiscounted"]["cost_by_event"][ename] += c_u
-                    totals["undiscounted"]["qaly_by_event"][ename] += q_u
-                    totals["undiscounted"]["cost_by_state"][st] += c_u
-                    totals["undiscounted"]["qaly_by_state"][st] += q_u
-                    totals["undiscounted"]["cost_by_state_event"][st][ename] += c_u
-                    totals["undiscounted"]["qaly_by_state_event"][st][ename] += q_u
-
-                    totals["discounted"]["cost_total"] += c_u * df_cost
-                    totals["discounted"]["qaly_total"] += q_u * df_qaly
-                    totals["discounted"]["cost_by_event"][ename] += c_u * df_cost
-                    totals["discounted"]["qaly_by_event"][ename] += q_u * df_qaly
-                    totals["discounted"]["cost_by_state"][st] += c_u * df_cost
-                    totals["discounted"]["qaly_by_state"][st] += q_u * df_qaly
-                    totals["discounted"]["cost_by_state_event"][st][ename] += c_u * df_cost
-                    totals["discounted"]["qaly_by_state_event"][st][ename] += q_u * df_qaly
-
-                # ---- flow effects (attributed to origin) ----
-                for i, origin in enumerate(health_states):
-                    c_flow_u = float(np.sum(F_t[i, :] * C_flow[i, :]))
-                    q_flow_u = float(np.sum(F_t[i, :] * U_flow[i, :]))
-
-                    cost_state_event_u[origin][ename] += c_flow_u
-                    qaly_state_event_u[origin][ename] += q_flow_u
-                    cost_state_event_d[origin][ename] += c_flow_u * df_cost
-                    qaly_state_event_d[origin][ename] += q_flow_u * df_qaly
-
-                    totals["undiscounted"]["cost_total"] += c_flow_u
-                    totals["undiscounted"]["qaly_total"] += q_flow_u
-                    totals["undiscounted"]["cost_by_event"][ename] += c_flow_u
-                    totals["undiscounted"]["qaly_by_event"][ename] += q_flow_u
-                    totals["undiscounted"]["cost_by_state"][origin] += c_flow_u
-                    totals["undiscounted"]["qaly_by_state"][origin] += q_flow_u
-                    totals["undiscounted"]["cost_by_state_event"][origin][ename] += c_flow_u
-                    totals["undiscounted"]["qaly_by_state_event"][origin][ename] += q_flow_u
-
-                    totals["discounted"]["cost_total"] += c_flow_u * df_cost
-                    totals["discounted"]["qaly_total"] += q_flow_u * df_qaly
-                    totals["discounted"]["cost_by_event"][ename] += c_flow_u * df_cost
-                    totals["discounted"]["qaly_by_event"][ename] += q_flow_u * df_qaly
-                    totals["discounted"]["cost_by_state"][origin] += c_flow_u * df_cost
-                    totals["discounted"]["qaly_by_state"][origin] += q_flow_u * df_qaly
-                    totals["discounted"]["cost_by_state_event"][origin][ename] += c_flow_u * df_cost
-                    totals["discounted"]["qaly_by_state_event"][origin][ename] += q_flow_u * df_qaly
-
-            cost_cse_u.append(cost_state_event_u)
-            qaly_cse_u.append(qaly_state_event_u)
-            cost_cse_d.append(cost_state_event_d)
-            qaly_cse_d.append(qaly_state_event_d)
-
-            # ---- next occupancy ----
-            s_by_cycle.append(s_t @ P_t)
-
-        # ---- save treatment results ----
-        occupancy_by_cycle = [
-            {st: float(svec[idx[st]]) for st in health_states}
-            for svec in s_by_cycle
-        ]
-
-        results["per_treatment"][trt] = {
-            "outcomes": {
-                "undiscounted": {
-                    "costs_per_cycle_state_event": cost_cse_u,
-                    "qalys_per_cycle_state_event": qaly_cse_u,
-                    "totals": totals["undiscounted"],
-                },
-                "discounted": {
-                    "costs_per_cycle_state_event": cost_cse_d,
-                    "qalys_per_cycle_state_event": qaly_cse_d,
-                    "totals": totals["discounted"],
-                },
-            },
-            "occupancy": {
-                "occupancy_by_cycle": occupancy_by_cycle,
-                "undiscounted": {"time_spent_per_cycle_state": ts_cs_u, "totals": ts_totals["undiscounted"]},
-                "discounted": {"time_spent_per_cycle_state": ts_cs_d, "totals": ts_totals["discounted"]},
-            },
-        }
-
-        totals_for_icer[trt] = {
-            "cost_discounted": totals["discounted"]["cost_total"],
-            "qaly_discounted": totals["discounted"]["qaly_total"],
-            "cost_undiscounted": totals["undiscounted"]["cost_total"],
-            "qaly_undiscounted": totals["undiscounted"]["qaly_total"],
-        }
-
-    # -------------------------
-    # ICERs
-    # -------------------------
-
-    ref = treatments[0]
-
-    def compute_icers(kind: str):
-        ref_cost = totals_for_icer[ref][f"cost_{kind}"]
-        ref_qaly = totals_for_icer[ref][f"qaly_{kind}"]
-        comps = []
-        for comp in treatments[1:]:
-            d_cost = ref_cost - totals_for_icer[comp][f"cost_{kind}"]
-            d_qaly =  ref_qaly - totals_for_icer[comp][f"qaly_{kind}"]
-            icer = None if abs(d_qaly) < 1e-12 else d_cost / d_qaly
-            comps.append({
-                "comparator": comp,
-                "delta_cost": d_cost,
-                "delta_qaly": d_qaly,
-                "icer": icer,
-            })
-        return {"reference_treatment": ref, "comparisons": comps}
-
-    results["icer"] = {
-        "discounted": compute_icers("discounted"),
-        "undiscounted": compute_icers("undiscounted"),
-        "note": "ICERs computed for both discounted and undiscounted totals",
+            s_t = s_by_cycle[:, cycle]  # (treatments, states)
+
+            for k, trt in enumerate(treatments):
+                P[k] = transition_matrix(trt, cycle)
+
+            # batched np.diag(s_t) @ P_t -> (treatments, states, states)
+            F = s_t[:, :, None] * P
+
+            for k, trt in enumerate(treatments):
+                accumulators[trt].record(
+                    cycle=cycle,
+                    s_t=s_t[k],
+                    F_t=F[k],
+                    per_event_impacts=event_impacts(trt, cycle),
+                )
+
+            s_by_cycle[:, cycle + 1] = np.einsum("ti,tij->tj", s_t, P)
+
+    else:
+
+        # =========================
+        # MAIN LOOP (by treatment)
+        # =========================
+
+        for k, trt in enumerate(treatments):
+
+            for cycle in range(n_cycles):
+
+                s_t = s_by_cycle[k, cycle]
+                P_t = transition_matrix(trt, cycle)
+
+                # equivalent to np.diag(s_t) @ P_t
+                F_t = s_t[:, None] * P_t
+
+                accumulators[trt].record(
+                    cycle=cycle,
+                    s_t=s_t,
+                    F_t=F_t,
+                    per_event_impacts=event_impacts(trt, cycle),
+                )
+
+                s_by_cycle[k, cycle + 1] = s_t @ P_t
+
+    # ---- half-cycle correction: one vector multiply per outcome tensor ----
+    if half_cycle_correction is not None:
+        for accumulator in accumulators.values():
+            accumulator.costs *= schedule.correction[:, None, None]
+            accumulator.qalys *= schedule.correction[:, None, None]
+
+    return {
+        "event_names": event_names,
+        "n_cycles": n_cycles,
+        "occupancy": s_by_cycle,
+        "accumulators": accumulators,
+        "df_cost": df_cost,
+        "df_qaly": df_qaly,
+        "correction": schedule.correction,
     }
 
-    return results
\ No newline at end of file
+
+def run_markov_model_columnar(
+    *,
+    build_transition_matrix_fn: Callable[[TransitionMatrixContext], np.ndarray],
+    event_specs: List[EventSpec],
+    parameters: Dict[str, Any],
+    health_states: List[str],
+    treatments: List[str],
+    cycle_length_years: float,
+    time_horizon_years: float,
+    disc_rate_cost_annual: float,
+    disc_rate_qaly_annual: float,
+    initial_occupancy: Dict[str, Any],
+    discount_timing: str = "mid",
+    batch_treatments: bool = False,
+    time_homogeneous: Optional[bool] = None,
+    hoist_invariant_events: bool = True,
+    half_cycle_correction: Optional[str] = None,
+) -> MarkovResults:
+    """
+    Runs simulate_cohorts and wraps its arrays in a MarkovResults (no per-cycle dicts are built).
+    See simulate_cohorts for batch_treatments, time_homogeneous, hoist_invariant_events and
+    half_cycle_correction.
+    """
+
+    sim = simulate_cohorts(
+        build_transition_matrix_fn=build_transition_matrix_fn,
+        event_specs=event_specs,
+        parameters=parameters,
+        health_states=health_states,
+        treatments=treatments,
+        cycle_length_years=cycle_length_years,
+        time_horizon_years=time_horizon_years,
+        disc_rate_cost_annual=disc_rate_cost_annual,
+        disc_rate_qaly_annual=disc_rate_qaly_annual,
+        initial_occupancy=initial_occupancy,
+        discount_timing=discount_timing,
+        batch_treatments=batch_treatments,
+        time_homogeneous=time_homogeneous,
+        hoist_invariant_events=hoist_invariant_events,
+        half_cycle_correction=half_cycle_correction,
+    )
+
+    settings = {
+        "health_states": health_states,
+        "cycle_length_years": cycle_length_years,
+        "time_horizon_years": time_horizon_years,
+        "discount_timing": discount_timing,
+        "disc_rate_cost_annual": disc_rate_cost_annual,
+        "discount_rate_qaly_annual": disc_rate_qaly_annual,
+        "initial_occupancy": initial_occupancy,
+        "half_cycle_correction": half_cycle_correction,
+    }
+
+    return MarkovResults.from_simulation(sim, treatments=treatments, settings=settings)
+
+
+def run_markov_model(
+    *,
+    build_transition_matrix_fn: Callable[[TransitionMatrixContext], np.ndarray],
+    event_specs: List[EventSpec],
+    parameters: Dict[str, Any],
+    health_states: List[str],
+    treatments: List[str],
+    cycle_length_years: float,
+    time_horizon_years: float,
+    disc_rate_cost_annual: float,
+    disc_rate_qaly_annual: float,
+    initial_occupancy: Dict[str, Any],
+    discount_timing: str = "mid",
+    batch_treatments: bool = False,
+    time_homogeneous: Optional[bool] = None,
+    hoist_invariant_events: bool = True,
+    half_cycle_correction: Optional[str] = None,
+
+) -> Dict[str, Any]:
+    """
+    Legacy entry point: run_markov_model_columnar expanded to the nested per-cycle dict shape,
+    as plain dicts (JSON-serialisable, isinstance dict). Callers that only read parts of it can
+    use run_markov_model_columnar(...).legacy_view() instead, which builds each breakdown on
+    first access.
+    """
+
+    return run_markov_model_columnar(
+        build_transition_matrix_fn=build_transition_matrix_fn,
+        event_specs=event_specs,
+        parameters=parameters,
+        health_states=health_states,
+        treatments=treatments,
+        cycle_length_years=cycle_length_years,
+        time_horizon_years=time_horizon_years,
+        disc_rate_cost_annual=disc_rate_cost_annual,
+        disc_rate_qaly_annual=disc_rate_qaly_annual,
+        initial_occupancy=initial_occupancy,
+        discount_timing=discount_timing,
+        batch_treatments=batch_treatments,
+        time_homogeneous=time_homogeneous,
+        hoist_invariant_events=hoist_invariant_events,
+        half_cycle_correction=half_cycle_correction,
+    ).to_legacy_dict()
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from backend.src.core.llm.llm_cancel import CancelToken, JobCancelled, current_cancel_token, current_job_workers
+from backend.src.core.llm.llm_stats import LLMStats, set_llm_step, use_llm_stats
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    job_id: str
+    process_name: str
+    status: str = QUEUED
+    step: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_token: CancelToken = field(default_factory=CancelToken, repr=False)
+    llm_stats: LLMStats = field(default_factory=LLMStats, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    workers: Set[Future] = field(default_factory=set, repr=False)  # in-flight blocking work (track_worker)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "process_name": self.process_name,
+            "status": self.status,
+            "step": self.step,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "llm_usage": self.llm_stats.to_dict(),
+        }
+
+
+# job the current context belongs to (set while a job runs, inherited by its worker threads)
+current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar("current_job", default=None)
+
+
+def set_job_step(step: str) -> None:
+    """
+    Record the current pipeline step on the running job, and attribute the LLM calls that follow
+    (in this context) to it.
+    """
+    set_llm_step(step)
+    job = current_job.get()
+    if job is not None:
+        job.step = step
+
+
+class JobManager:
+
+    """
+    Registry and admission control for long-running background jobs (model generation).
+
+    At most max_running jobs run at once; further submissions wait in FIFO order, and once
+    max_queued are waiting new submissions are refused (JobQueueFull). Cancelling a job sets its
+    CancelToken, so in-flight LLM calls in worker threads stop at their next check, and cancels
+    its task. A running job keeps its slot until its worker threads / processes have actually
+    stopped, so max_running bounds the real concurrent work. A job cancelled while still queued
+    gets a terminal progress message from here, as its runner never starts. Finished jobs are
+    kept (most recent keep_finished) so their state can be queried.
+    """
+
+    def __init__(self, max_running: int = 2, max_queued: int = 20, keep_finished: int = 200):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self.jobs: Dict[str, Job] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None  # created on first use, in the server's loop
+
+    @classmethod
+    def from_env(cls) -> "JobManager":
+        return cls(
+            max_running=int(os.getenv("MAX_RUNNING_JOBS", "2")),
+            max_queued=int(os.getenv("MAX_QUEUED_JOBS", "20")),
+        )
+
+    def _waiting_count(self) -> int:
+        """Jobs that will not get a running slot straight away."""
+        queued = sum(1 for j in self.jobs.values() if j.status == QUEUED)
+        running = sum(1 for j in self.jobs.values() if j.status == RUNNING)
+        return max(0, queued - max(0, self.max_running - running))
+
+    def submit(
+        self,
+        run: Callable[[], Awaitable[Any]],
+        *,
+        process_name: str,
+        job_id: Optional[str] = None,
+    ) -> Job:
+        """Queue run() as a job. Must be called from within the event loop."""
+        if self._waiting_count() >= self.max_queued:
+            raise JobQueueFull(f"{self.max_queued} jobs are already waiting")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+
+        job = Job(job_id=job_id or uuid.uuid4().hex, process_name=process_name)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, run: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._semaphore:
+                job.cancel_token.raise_if_cancelled()
+                job.status = RUNNING
+                job.started_at = time.time()
+
+                # the task has its own context; these reach the LLM worker threads via run_blocking
+                current_job.set(job)
+                current_cancel_token.set(job.cancel_token)
+                current_job_workers.set(job.workers)
+                use_llm_stats(job.llm_stats)
+
+                try:
+                    await run()
+                finally:
+                    await self._wait_for_workers(job)
+                job.status = DONE
+
+        except (JobCancelled, asyncio.CancelledError):
+            job.status = CANCELLED
+            if job.started_at is None:
+                await self._notify_cancelled_before_start(job)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.job_id, job.process_name)
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+
+    @staticmethod
+    async def _wait_for_workers(job: Job) -> None:
+        """
+        Hold the job's slot until its blocking work has stopped: work not started yet is
+        dropped, threads stop at their next cancel-token check, processes run to completion.
+        """
+        while job.workers:
+            pending = list(job.workers)
+            if job.cancel_token.cancelled:
+                for future in pending:
+                    future.cancel()
+            # errors are the job's to report; here we only wait
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in pending), return_exceptions=True)
+
+    @staticmethod
+    async def _notify_cancelled_before_start(job: Job) -> None:
+        # imported here: websocket_manager imports this module
+        from backend.websockets.websocket_manager import manager
+        try:
+            await manager.send_message(
+                message_type="progress",
+                payload={"message": "⏹ Cancelled before it started."},
+                process_name=job.process_name,
+                process_complete=True,
+                job_id=job.job_id,
+            )
+        except Exception:
+            logger.exception("Failed to send WS cancel message for job %s", job.job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, status: Optional[str] = None) -> List[Job]:
+        jobs = sorted(self.jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return [j for j in jobs if status is None or j.status == status]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES or job.cancel_token.cancelled:
+            return job
+        job.cancel_token.cancel()
+        if job.task is not None:
+            job.task.cancel()
+        return job
+
+    def _prune(self) -> None:
+        finished = [j for j in self.jobs.values() if j.status in FINISHED_STATES]
+        for job in sorted(finished, key=lambda j: j.finished_at or 0)[:-self.keep_finished or None]:
+            del self.jobs[job.job_id]
+
+
+job_manager = JobManager.from_env()
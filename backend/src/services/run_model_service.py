@@ -0,0 +1,79 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from backend.src.core.llm.llm_cancel import track_worker
+from backend.src.file_management.save_snapshot import working_model_dir
+from backend.src.file_management.snapshot_catalogue import snapshot_dir_for
+from backend.src.run_model.run_model import run_model_from_snapshot
+from backend.src.services.job_manager import current_job, set_job_step
+from backend.websockets.result_stream import publish_results
+from backend.websockets.websocket_manager import manager
+
+PROCESS_NAME = "run_model"
+
+# Model runs are CPU-bound, so they get their own process pool instead of sharing the LLM
+# executor (see llm_funcs.run_blocking): a long run never holds up LLM steps of other jobs.
+_MODEL_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _model_executor() -> ProcessPoolExecutor:
+    global _MODEL_EXECUTOR
+    with _executor_lock:
+        if _MODEL_EXECUTOR is None:
+            _MODEL_EXECUTOR = ProcessPoolExecutor(max_workers=int(os.getenv("MODEL_RUN_MAX_WORKERS", "2")))
+        return _MODEL_EXECUTOR
+
+
+def resolve_model_dir(snapshot_id: Optional[str] = None) -> str:
+    """
+    Server-side directory of the model to run: the saved snapshot snapshot_id, or the working
+    copy of the latest generated model when None. Raises LookupError if there is none.
+    """
+    if snapshot_id is None:
+        base = working_model_dir()
+        if not (base / "snapshot.json").exists():
+            raise LookupError("No working model has been generated yet")
+        return str(base)
+
+    path = snapshot_dir_for(snapshot_id)
+    if path is None or not (Path(path) / "snapshot.json").exists():
+        raise LookupError(f"Unknown snapshot: {snapshot_id}")
+    return path
+
+
+async def run_model_job(*, model_dir: str, half_cycle_correction: Optional[str] = None) -> None:
+    """
+    Run the model saved in model_dir (see resolve_model_dir) and announce the results with
+    results_ready, whose payload is the result stream manifest; the client then pulls the arrays
+    in chunks. Only code already on the server is executed.
+    """
+    await manager.send_message(
+        message_type="process_start",
+        payload={"message": "Running model…"},
+        process_name=PROCESS_NAME,
+        process_complete=False,
+    )
+
+    set_job_step("Running model")
+    # tracked on the job, so cancelling it keeps its slot until the worker process is done
+    future = track_worker(_model_executor().submit(
+        run_model_from_snapshot,
+        snapshot_dir=model_dir,
+        half_cycle_correction=half_cycle_correction,
+    ))
+    results = await asyncio.wrap_future(future)
+
+    await manager.send_message(
+        message_type="progress",
+        payload={"message": "✅ Model run complete."},
+        process_name=PROCESS_NAME,
+        process_complete=False,
+    )
+
+    job = current_job.get()
+    await publish_results(results, process_name=PROCESS_NAME, stream_id=job.job_id if job is not None else None)
@@ -0,0 +1,276 @@
+import json
+import os
+import struct
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.src.run_model.results import DISCOUNTING, MarkovResults
+from backend.websockets.websocket_manager import Connection, encode, manager
+
+# target size of one binary chunk; arrays are split along the cycle axis to stay under it
+DEFAULT_CHUNK_BYTES = int(os.getenv("RESULT_CHUNK_BYTES", str(256 * 1024)))
+
+# finished result streams kept in memory for (re)download
+DEFAULT_KEEP_STREAMS = int(os.getenv("RESULT_STREAMS_KEEP", "20"))
+
+# chunk frame layout: b"MRC1" | uint32 header length (big-endian) | JSON header | padding | data
+# the padding puts the data at a multiple of 8 bytes, so the browser can view it as a Float64Array
+CHUNK_MAGIC = b"MRC1"
+DTYPE = "<f8"
+
+
+def encode_chunk(stream_id: str, index: int, data: bytes) -> bytes:
+    header = json.dumps({"stream_id": stream_id, "index": index}).encode("utf-8")
+    offset = len(CHUNK_MAGIC) + 4 + len(header)
+    header += b" " * (-offset % 8)
+    return CHUNK_MAGIC + struct.pack(">I", len(header)) + header + data
+
+
+def decode_chunk(frame: bytes) -> Tuple[Dict[str, Any], bytes]:
+    if frame[:4] != CHUNK_MAGIC:
+        raise ValueError("Not a result chunk frame")
+    (n,) = struct.unpack(">I", frame[4:8])
+    return json.loads(frame[8:8 + n]), frame[8 + n:]
+
+
+class ChunkedStream:
+
+    """
+    A payload laid out as an ordered list of chunks, so it can be sent over a websocket as a small
+    JSON manifest followed by binary chunk frames (see encode_chunk). Subclasses fill self.chunks
+    (manifest entries, "encoding" "json" or "array") and implement chunk_data(index).
+
+    The layout is fixed when the stream is created and chunk bytes are produced on demand, one at
+    a time, so resuming from chunk index n always continues the same sequence and no single
+    serialised copy of the payload is ever held in memory.
+    """
+
+    kind = "stream"
+
+    def __init__(self, *, stream_id: Optional[str] = None):
+        self.stream_id = stream_id or uuid.uuid4().hex
+        self.chunks: List[Dict[str, Any]] = []
+
+    def _number_chunks(self) -> None:
+        for i, chunk in enumerate(self.chunks):
+            chunk["index"] = i
+
+    def manifest(self) -> Dict[str, Any]:
+        return {"stream_id": self.stream_id, "kind": self.kind, "chunks": self.chunks}
+
+    def chunk_data(self, index: int) -> bytes:
+        raise NotImplementedError
+
+    def frames(self, from_chunk: int = 0) -> Iterator[bytes]:
+        for index in range(max(0, from_chunk), len(self.chunks)):
+            yield encode_chunk(self.stream_id, index, self.chunk_data(index))
+
+
+class ResultStream(ChunkedStream):
+
+    """
+    A MarkovResults as a chunked stream.
+
+    Order: chunk 0 is the JSON summary (totals, breakdowns and ICERs for every treatment), then
+    the per-cycle discount factors, then per treatment its occupancy, costs and qalys arrays
+    (undiscounted, (cycle, ...) slices of at most chunk_bytes). A client can therefore render the
+    headline numbers as soon as the first chunk lands.
+    """
+
+    kind = "model_results"
+
+    def __init__(self, results: MarkovResults, *, stream_id: Optional[str] = None,
+                 chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        super().__init__(stream_id=stream_id)
+        self.results = results
+        self.chunk_bytes = chunk_bytes
+        self.chunks = self._plan()
+        self._number_chunks()
+
+    def _plan(self) -> List[Dict[str, Any]]:
+        r = self.results
+        chunks: List[Dict[str, Any]] = [{"name": "summary", "encoding": "json"}]
+
+        for name in ("df_cost", "df_qaly", "correction"):
+            chunks.append({"name": name, "encoding": "array", "dtype": DTYPE,
+                           "shape": list(getattr(r, name).shape)})
+
+        for k, trt in enumerate(r.treatments):
+            for name in ("occupancy", "costs", "qalys"):
+                arr = getattr(r, name)[k]
+                row_bytes = max(1, int(np.prod(arr.shape[1:])) * 8)
+                rows = max(1, self.chunk_bytes // row_bytes)
+                for start in range(0, arr.shape[0], rows):
+                    stop = min(arr.shape[0], start + rows)
+                    chunks.append({
+                        "name": name,
+                        "treatment": trt,
+                        "encoding": "array",
+                        "dtype": DTYPE,
+                        "cycle_start": start,
+                        "cycle_stop": stop,
+                        "shape": [stop - start, *arr.shape[1:]],
+                    })
+        return chunks
+
+    def manifest(self) -> Dict[str, Any]:
+        r = self.results
+        return {
+            **super().manifest(),
+            "axes": {
+                "treatment": r.treatments,
+                "discounting": list(DISCOUNTING),
+                "n_cycles": r.n_cycles,
+                "state": r.health_states,
+                "event": r.event_names,
+            },
+            "settings": r.settings,
+            "array_layout": {
+                "occupancy": ["cycle", "state"],
+                "costs": ["cycle", "state", "event"],
+                "qalys": ["cycle", "state", "event"],
+            },
+        }
+
+    def _summary(self) -> Dict[str, Any]:
+        r = self.results
+        per_treatment = {}
+        for trt in r.treatments:
+            per_treatment[trt] = {
+                variant: {
+                    "cost_total": r.total("costs", trt, discounted=discounted),
+                    "qaly_total": r.total("qalys", trt, discounted=discounted),
+                    "cost_by_state": r.by_state("costs", trt, discounted=discounted),
+                    "qaly_by_state": r.by_state("qalys", trt, discounted=discounted),
+                    "cost_by_event": r.by_event("costs", trt, discounted=discounted),
+                    "qaly_by_event": r.by_event("qalys", trt, discounted=discounted),
+                }
+                for variant, discounted in (("undiscounted", False), ("discounted", True))
+            }
+            per_treatment[trt]["time_spent_by_state"] = r.time_spent_by_state(trt)
+        return {"per_treatment": per_treatment, "icer": r.legacy_view()["icer"]}
+
+    def chunk_data(self, index: int) -> bytes:
+        chunk = self.chunks[index]
+        if chunk["encoding"] == "json":
+            return json.dumps(self._summary()).encode("utf-8")
+
+        r = self.results
+        if "treatment" not in chunk:
+            arr = getattr(r, chunk["name"])
+        else:
+            k = r.treatments.index(chunk["treatment"])
+            arr = getattr(r, chunk["name"])[k, chunk["cycle_start"]:chunk["cycle_stop"]]
+        return np.ascontiguousarray(arr, dtype=DTYPE).tobytes()
+
+
+class BundleStream(ChunkedStream):
+
+    """
+    A generated model bundle as a chunked stream of JSON parts: first the small settings
+    (description, health states, treatments, horizon, ...), then the parameters, the transition
+    matrix data and one chunk per event, so the UI can lay out the model before the code arrives.
+    """
+
+    kind = "model_bundle"
+
+    # large sections, sent after the settings; list sections are sent one item per chunk
+    SECTIONS = ("parameters", "transition_matrix_data", "event_data")
+
+    def __init__(self, bundle: Dict[str, Any], *, stream_id: Optional[str] = None):
+        super().__init__(stream_id=stream_id)
+        self.bundle = bundle
+        self.chunks = [{"name": "settings", "encoding": "json"}]
+        for name in self.SECTIONS:
+            value = bundle.get(name)
+            if isinstance(value, list):
+                self.chunks.extend({"name": name, "encoding": "json", "item": i} for i in range(len(value)))
+            else:
+                self.chunks.append({"name": name, "encoding": "json"})
+        self._number_chunks()
+
+    def manifest(self) -> Dict[str, Any]:
+        lists = {name: len(self.bundle[name]) for name in self.SECTIONS if isinstance(self.bundle.get(name), list)}
+        return {**super().manifest(), "list_sections": lists}
+
+    def chunk_data(self, index: int) -> bytes:
+        chunk = self.chunks[index]
+        if chunk["name"] == "settings":
+            value = {k: v for k, v in self.bundle.items() if k not in self.SECTIONS}
+        elif "item" in chunk:
+            value = self.bundle[chunk["name"]][chunk["item"]]
+        else:
+            value = self.bundle.get(chunk["name"])
+        return json.dumps(value).encode("utf-8")
+
+
+class ResultStore:
+
+    """Most recent streams by stream_id, so clients can fetch (or resume) them after the run."""
+
+    def __init__(self, keep: int = DEFAULT_KEEP_STREAMS):
+        self.keep = keep
+        self._streams: "OrderedDict[str, ChunkedStream]" = OrderedDict()
+
+    def add(self, stream: ChunkedStream) -> ChunkedStream:
+        self._streams[stream.stream_id] = stream
+        self._streams.move_to_end(stream.stream_id)
+        while len(self._streams) > self.keep:
+            self._streams.popitem(last=False)
+        return stream
+
+    def get(self, stream_id: str) -> Optional[ChunkedStream]:
+        return self._streams.get(stream_id)
+
+
+result_store = ResultStore()
+
+
+async def publish_stream(stream: ChunkedStream, *, message_type: str, process_name: str,
+                         job_id: Optional[str] = None) -> ChunkedStream:
+    """
+    Register stream and send message_type as the job's terminal message. The message carries
+    only the manifest; clients pull the chunks with {"action": "get_results", "stream_id"}.
+    """
+    result_store.add(stream)
+    await manager.send_message(
+        message_type=message_type,
+        payload={"manifest": stream.manifest()},
+        process_name=process_name,
+        process_complete=True,
+        job_id=job_id,
+    )
+    return stream
+
+
+async def publish_results(results: MarkovResults, *, process_name: str, stream_id: Optional[str] = None,
+                          job_id: Optional[str] = None) -> ChunkedStream:
+    """Announce a finished model run (results_ready); see publish_stream."""
+    return await publish_stream(ResultStream(results, stream_id=stream_id), message_type="results_ready",
+                                process_name=process_name, job_id=job_id)
+
+
+async def publish_bundle(bundle: Dict[str, Any], *, process_name: str, stream_id: Optional[str] = None,
+                         job_id: Optional[str] = None) -> ChunkedStream:
+    """Announce a generated model bundle (model_bundle_ready); see publish_stream."""
+    return await publish_stream(BundleStream(bundle, stream_id=stream_id), message_type="model_bundle_ready",
+                                process_name=process_name, job_id=job_id)
+
+
+async def stream_results(connection: Connection, stream: ChunkedStream, from_chunk: int = 0) -> None:
+    """
+    Send the manifest and then chunks from_chunk onwards to one connection, ending with a
+    result_stream_end message. Everything goes through the connection's queue with flow control
+    (see Connection.send_reliable): never dropped, and only produced as fast as the socket drains.
+    """
+    await connection.send_reliable(encode({"type": "result_manifest", "payload": stream.manifest()},
+                                          connection.encoding))
+    for frame in stream.frames(from_chunk):
+        await connection.send_reliable(frame)
+    await connection.send_reliable(encode(
+        {"type": "result_stream_end", "payload": {"stream_id": stream.stream_id, "chunks": len(stream.chunks)}},
+        connection.encoding,
+    ))
@@ -1,18 +1,107 @@
 import asyncio
+import json
+import os
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from backend.websockets.websocket_manager import manager
+from backend.websockets.result_stream import result_store, stream_results
+from backend.websockets.websocket_manager import available_encodings, manager
 
 router = APIRouter()
 
+# Application-level heartbeat, independent of how the server is launched (uvicorn's protocol
+# pings are only configured when running main.py directly): after IDLE seconds without a frame
+# from the client the server sends {"type": "ping"}, and closes the connection if nothing arrives
+# within TIMEOUT seconds after that.
+WS_IDLE_PING_S = float(os.getenv("WS_IDLE_PING_S", "30"))
+WS_PONG_TIMEOUT_S = float(os.getenv("WS_PONG_TIMEOUT_S", "30"))
+
+
+async def _receive_text(websocket: WebSocket) -> Optional[str]:
+    """Next text frame from the client; None for a binary frame (which this endpoint does not accept)."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message.get("text")
+
+
+def _from_chunk(frame: dict) -> Optional[int]:
+    try:
+        from_chunk = int(frame.get("from_chunk", 0))
+    except (TypeError, ValueError):
+        return None
+    return from_chunk if from_chunk >= 0 else None
+
+
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, job_id: Optional[str] = None, encoding: str = "json"):
     """
-    WebSocket endpoint for upload progress notifications.
-    Frontend connects to: ws://127.0.0.1:8000/ws
+    WebSocket endpoint for progress notifications.
+    Frontend connects to: ws://127.0.0.1:8000/ws (every job) or ws://127.0.0.1:8000/ws?job_id=<id>
+    Add &encoding=msgpack for MessagePack binary frames instead of JSON text (if msgpack is installed).
+
+    The handler only wakes when the client sends a frame:
+      {"action": "subscribe", "job_id": "<id>"}     follow a job (after the first, only followed jobs are sent)
+      {"action": "unsubscribe", "job_id": "<id>"}   stop following it; without job_id, follow every job again
+      {"action": "ping"}                            application-level liveness check, answered with "pong"
+      {"action": "pong"}                            answer to the server's idle "ping" (any frame will do)
+      {"action": "get_results", "stream_id": "<id>", "from_chunk": 0}
+                                                    stream run results announced by "results_ready": a
+                                                    result_manifest, binary chunk frames from from_chunk
+                                                    on (to resume), then result_stream_end (see result_stream.py)
+    Dead peers are detected by the application-level heartbeat (WS_IDLE_PING_S / WS_PONG_TIMEOUT_S),
+    whatever server options are used; main.py also enables uvicorn's protocol-level ping/pong when
+    run directly.
     """
-    await manager.connect(websocket)
+    if encoding not in available_encodings():
+        await websocket.close(code=1003, reason=f"Unsupported encoding: {encoding}")
+        return
+
+    connection = await manager.connect(websocket, topics={job_id} if job_id else None, encoding=encoding)
     try:
         while True:
-            await asyncio.sleep(1)  # just keep the socket alive
+            try:
+                text = await asyncio.wait_for(_receive_text(websocket), timeout=WS_IDLE_PING_S)
+            except asyncio.TimeoutError:
+                manager.send_to(connection, "ping", {})
+                try:
+                    text = await asyncio.wait_for(_receive_text(websocket), timeout=WS_PONG_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    await websocket.close(code=1001, reason="Heartbeat timeout")
+                    break
+            if text is None:
+                manager.send_to(connection, "error", {"message": "Binary frames are not accepted; send JSON text"})
+                continue
+            try:
+                frame = json.loads(text)
+                action = frame.get("action")
+            except (ValueError, AttributeError):
+                manager.send_to(connection, "error", {"message": "Frames must be JSON objects"})
+                continue
+
+            if action == "subscribe" and frame.get("job_id"):
+                manager.subscribe(connection, str(frame["job_id"]))
+                manager.send_to(connection, "subscribed", {"job_ids": sorted(connection.topics)})
+            elif action == "unsubscribe":
+                manager.unsubscribe(connection, frame.get("job_id"))
+                topics = None if connection.topics is None else sorted(connection.topics)
+                manager.send_to(connection, "subscribed", {"job_ids": topics})
+            elif action == "get_results":
+                stream = result_store.get(str(frame.get("stream_id")))
+                if stream is None:
+                    manager.send_to(connection, "error", {"message": f"Unknown result stream: {frame.get('stream_id')}"})
+                    continue
+                from_chunk = _from_chunk(frame)
+                if from_chunk is None:
+                    manager.send_to(connection, "error", {"message": f"from_chunk must be a non-negative integer, got {frame.get('from_chunk')!r}"})
+                    continue
+                connection.run(stream_results(connection, stream, from_chunk=from_chunk))
+            elif action == "ping":
+                manager.send_to(connection, "pong", {})
+            elif action == "pong":
+                continue
+            else:
+                manager.send_to(connection, "error", {"message": f"Unknown action: {action}"})
     except WebSocketDisconnect:
-        manager.disconnect()
+        pass
+    finally:
+        manager.disconnect(connection)
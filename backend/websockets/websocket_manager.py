@@ -1,45 +1,304 @@
 import asyncio
 import json
-from typing import Any
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
 
 from fastapi import WebSocket
 
+from backend.src.services.job_manager import current_job
+
+try:  # optional binary encoding
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# messages that must reach every subscribed client, however far behind it is
+TERMINAL_MESSAGE_TYPES = {"model_bundle_ready", "results_ready"}
+
+# only the latest pending message of these types matters (counters such as PSA iteration progress)
+COALESCE_LATEST_TYPES = {"psa_progress", "run_progress"}
+
+# consecutive pending messages of these types are merged by concatenating payload["delta"]
+COALESCE_DELTA_TYPES = {"llm_stream"}
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_MAX_FRAMES_PER_SECOND = float(os.getenv("WS_MAX_FRAMES_PER_SECOND", "10"))
+
+ENCODINGS = ("json", "msgpack")
+
+Frame = Union[str, bytes]
+
+
+def is_terminal(message: Dict[str, Any]) -> bool:
+    return bool(message.get("process_complete")) or message.get("type") in TERMINAL_MESSAGE_TYPES
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ENCODINGS if msgpack is not None else ("json",)
+
+
+def encode(message: Dict[str, Any], encoding: str) -> Frame:
+    if encoding == "msgpack":
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message)
+
+
+def _coalesce(pending: List[Dict[str, Any]], message: Dict[str, Any]) -> None:
+    """Add message to a job's pending list, merging it into what is already there where possible."""
+    kind = message["type"]
+
+    if kind in COALESCE_DELTA_TYPES:
+        # latest-only messages carry no ordering, so look back past them
+        for last in reversed(pending):
+            if last["type"] in COALESCE_LATEST_TYPES:
+                continue
+            if last["type"] == kind and last["process_name"] == message["process_name"]:
+                last["payload"] = {**last["payload"], "delta": last["payload"].get("delta", "") + message["payload"].get("delta", "")}
+                return
+            break
+
+    if kind in COALESCE_LATEST_TYPES:
+        pending[:] = [m for m in pending if m["type"] != kind]
+
+    pending.append(message)
+
+
+class ProgressBatcher:
+
+    """
+    Per-job throttle in front of publish. Non-terminal messages for a job are held (and coalesced,
+    see _coalesce) and flushed at most max_frames_per_second times a second, as the message itself
+    or, when several are pending, one "batch" frame: {"type": "batch", "job_id", "messages": [...]}.
+    A terminal message first flushes whatever is pending for its job and is then published at
+    once, so it is never delayed, merged or dropped here.
+    """
+
+    def __init__(self, publish: Callable[[Dict[str, Any]], None], max_frames_per_second: float):
+        self._publish = publish
+        self.min_interval = 1.0 / max_frames_per_second if max_frames_per_second > 0 else 0.0
+        self._pending: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        self._last_flush: Dict[Optional[str], float] = {}
+        self._scheduled: Set[Optional[str]] = set()
+
+    def add(self, message: Dict[str, Any]) -> None:
+        job_id = message.get("job_id")
+
+        if is_terminal(message):
+            self.flush(job_id)
+            self._last_flush.pop(job_id, None)
+            self._publish(message)
+            return
+
+        _coalesce(self._pending.setdefault(job_id, []), message)
+
+        if job_id not in self._scheduled:
+            self._scheduled.add(job_id)
+            delay = max(0.0, self._last_flush.get(job_id, 0.0) + self.min_interval - time.monotonic())
+            asyncio.get_running_loop().call_later(delay, self._scheduled_flush, job_id)
+
+    def _scheduled_flush(self, job_id: Optional[str]) -> None:
+        self._scheduled.discard(job_id)
+        self.flush(job_id)
+
+    def flush(self, job_id: Optional[str]) -> None:
+        pending = self._pending.pop(job_id, None)
+        if not pending:
+            return
+        self._last_flush[job_id] = time.monotonic()
+
+        if len(pending) == 1:
+            self._publish(pending[0])
+        else:
+            self._publish({
+                "type": "batch",
+                "process_name": pending[-1]["process_name"],
+                "job_id": job_id,
+                "messages": pending,
+                "process_complete": False,
+            })
+
+
+class Connection:
+
+    """
+    One client socket with its own bounded send queue, drained by its own sender task, so a slow
+    client only delays itself. topics: job ids the client follows; None means every job.
+    When the queue is full the oldest non-terminal message is dropped to make room; bulk
+    transfers use send_reliable instead, which waits for room. Tasks started with run() (e.g.
+    result streams) are cancelled when the connection stops.
+    """
+
+    def __init__(self, websocket: WebSocket, topics: Optional[Set[str]] = None, max_queue: int = DEFAULT_QUEUE_SIZE,
+                 encoding: str = "json"):
+        self.websocket = websocket
+        self.topics = topics
+        self.encoding = encoding
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._queue: Deque[Tuple[Frame, bool]] = deque()  # (frame, terminal)
+        self._ready = asyncio.Event()
+        self._sent = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def wants(self, job_id: Optional[str]) -> bool:
+        # messages not tied to a job go to everyone
+        return self.topics is None or job_id is None or job_id in self.topics
+
+    def enqueue(self, frame: Frame, terminal: bool) -> None:
+        if len(self._queue) >= self.max_queue:
+            for i, (_, queued_terminal) in enumerate(self._queue):
+                if not queued_terminal:
+                    del self._queue[i]
+                    self.dropped += 1
+                    break
+            else:
+                if not terminal:  # queue is all terminal frames; drop the newcomer instead
+                    self.dropped += 1
+                    return
+
+        self._queue.append((frame, terminal))
+        self._ready.set()
+
+    async def send_reliable(self, frame: Frame) -> None:
+        """Enqueue a frame that must not be dropped, first waiting until the queue is at most half full."""
+        while len(self._queue) >= max(1, self.max_queue // 2):
+            self._sent.clear()
+            await self._sent.wait()
+        self.enqueue(frame, terminal=True)
+
+    async def _send_loop(self, on_error) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    frame, _ = self._queue.popleft()
+                    if isinstance(frame, bytes):
+                        await self.websocket.send_bytes(frame)
+                    else:
+                        await self.websocket.send_text(frame)
+                    self._sent.set()
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            on_error(self)
+
+    def start(self, on_error) -> None:
+        self._sender = asyncio.create_task(self._send_loop(on_error))
+
+    def run(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def stop(self) -> None:
+        if self._sender is not None:
+            self._sender.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connection = None
 
-    async def connect(self, websocket: WebSocket):
+    """
+    Pub/sub hub for progress messages. Any number of clients may be connected; each receives
+    the messages of the jobs it subscribed to (all jobs by default), JSON text or MessagePack
+    binary frames as it asked. send_message goes through a per-job ProgressBatcher; publish
+    serialises once per encoding and only enqueues, so producers never wait on client sockets.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE,
+                 max_frames_per_second: float = DEFAULT_MAX_FRAMES_PER_SECOND):
+        self.connections: Set[Connection] = set()
+        self.max_queue = max_queue
+        self.batcher = ProgressBatcher(self.publish, max_frames_per_second)
+
+    async def connect(self, websocket: WebSocket, topics: Optional[Set[str]] = None,
+                      encoding: str = "json") -> Connection:
+        if encoding not in available_encodings():
+            raise ValueError(f"Unsupported websocket encoding: {encoding}")
         await websocket.accept()
-        print("WS connection open")
-        self.active_connection = websocket
+        connection = Connection(websocket, topics=topics, max_queue=self.max_queue, encoding=encoding)
+        connection.start(on_error=self.disconnect)
+        self.connections.add(connection)
+        print(f"WS connection open ({len(self.connections)} connected)")
+        return connection
+
+    def disconnect(self, connection: Connection):
+        if connection in self.connections:
+            self.connections.discard(connection)
+            connection.stop()
+            print(f"WS disconnected ({len(self.connections)} connected)")
+
+    def subscribe(self, connection: Connection, job_id: str) -> None:
+        if connection.topics is None:
+            connection.topics = set()
+        connection.topics.add(job_id)
+
+    def unsubscribe(self, connection: Connection, job_id: Optional[str] = None) -> None:
+        """Stop following job_id; with no job_id, go back to following every job."""
+        if job_id is None:
+            connection.topics = None
+        elif connection.topics is not None:
+            connection.topics.discard(job_id)
 
-    def disconnect(self):
-        print("WS disconnected")
-        self.active_connection = None
+    def send_to(self, connection: Connection, message_type: str, payload: Any) -> None:
+        """Reply to one client (through its queue, so frames never interleave on the socket)."""
+        connection.enqueue(encode({"type": message_type, "payload": payload}, connection.encoding), terminal=False)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        job_id = message.get("job_id")
+        targets = [c for c in self.connections if c.wants(job_id)]
+        if not targets:
+            return
+        frames: Dict[str, Frame] = {}
+        terminal = is_terminal(message)
+        for connection in targets:
+            if connection.encoding not in frames:
+                frames[connection.encoding] = encode(message, connection.encoding)
+            connection.enqueue(frames[connection.encoding], terminal)
+
+    def post(self, message_type: str, payload: Any, process_name: str = "default",
+             process_complete=False, job_id: Optional[str] = None) -> None:
+        """
+        Synchronous form of send_message, for callbacks scheduled on the loop (e.g. with
+        loop.call_soon_threadsafe from a worker thread). Must run in the event loop thread.
+        """
+        if job_id is None:
+            job = current_job.get()
+            job_id = job.job_id if job is not None else None
+
+        self.batcher.add({
+            "type": message_type,
+            "process_name": process_name,
+            "job_id": job_id,
+            "payload": payload,
+            "process_complete": process_complete,
+        })
 
     async def send_message(self, message_type: str, payload: Any, process_name: str = "default",
-                           process_complete=False):
+                           process_complete=False, job_id: Optional[str] = None):
         """
-        Send a structured JSON message to the active connection.
+        Publish a structured message to every client following its job (throttled and coalesced
+        per job, see ProgressBatcher; terminal messages go out immediately).
+        job_id defaults to the job the caller is running in (None outside jobs: sent to everyone).
         Example message:
         {
             "type": "upload_progress",
             "process": "model_upload",
+            "job_id": "3f2a...",
             "payload": {
                 "progress": 45,
                 "status": "parsing sheet..."
             }
         }
         """
-        if self.active_connection:
-            message = {
-                "type": message_type,
-                "process_name": process_name,
-                "payload": payload,
-                "process_complete": process_complete,
-            }
-            await self.active_connection.send_text(json.dumps(message))
-            await asyncio.sleep(0)
+        self.post(message_type, payload, process_name, process_complete, job_id)
+        await asyncio.sleep(0)
 
 
 # Create a single global manager instance
@@ -1,5 +1,6 @@
 // src/context/Context.jsx
 import React, { createContext, useRef, useEffect, useState } from "react";
+import { assembleStream, decodeResultChunk, nextChunkIndex } from "../utils/resultStream";
 
 export const WebSocketContext = createContext(null);
 
@@ -7,16 +8,86 @@ export const WebSocketProvider = ({ children }) => {
   const ws = useRef(null);
   const [isConnected, setIsConnected] = useState(false);
   const [messages, setMessages] = useState([]);
+  // assembled chunked payloads (model_bundle_ready / results_ready), latest per process:
+  // {stream_id: {kind, jobId, processName, value}}
+  const [streams, setStreams] = useState({});
+  // streams still arriving: {stream_id: {manifest, jobId, processName, chunks: {index: chunk}}}
+  const pendingStreams = useRef({});
 
   useEffect(() => {
     ws.current = new WebSocket("ws://localhost:8000/ws");
+    ws.current.binaryType = "arraybuffer";
 
     ws.current.onopen = () => {
       console.log("WebSocket connected");
       setIsConnected(true);
     };
 
+    const requestStream = (streamId, fromChunk = 0) => {
+      ws.current.send(JSON.stringify({ action: "get_results", stream_id: streamId, from_chunk: fromChunk }));
+    };
+
+    const handleStreamMessage = (m) => {
+      // a new run of a process supersedes its unfinished streams
+      if (m.type === "process_start") {
+        Object.entries(pendingStreams.current).forEach(([id, p]) => {
+          if (p.processName === m.process_name && p.jobId !== m.job_id) delete pendingStreams.current[id];
+        });
+        return;
+      }
+
+      // terminal messages carrying a manifest: pull the chunks
+      const manifest = m.payload?.manifest;
+      if (manifest?.stream_id) {
+        pendingStreams.current[manifest.stream_id] = {
+          manifest,
+          jobId: m.job_id,
+          processName: m.process_name,
+          chunks: {},
+        };
+        requestStream(manifest.stream_id);
+        return;
+      }
+
+      if (m.type === "result_stream_end") {
+        const streamId = m.payload.stream_id;
+        const pending = pendingStreams.current[streamId];
+        if (!pending) return;
+
+        const next = nextChunkIndex(pending.chunks, pending.manifest);
+        if (next < pending.manifest.chunks.length) {
+          requestStream(streamId, next); // resume where it left off
+          return;
+        }
+
+        // assembled: drop the raw chunks, keep only the latest payload per process
+        delete pendingStreams.current[streamId];
+        const value = assembleStream(pending.manifest, pending.chunks);
+        setStreams((prev) => {
+          const kept = Object.fromEntries(
+            Object.entries(prev).filter(([, s]) => s.processName !== pending.processName)
+          );
+          return {
+            ...kept,
+            [streamId]: { kind: pending.manifest.kind, jobId: pending.jobId, processName: pending.processName, value },
+          };
+        });
+      }
+    };
+
     ws.current.onmessage = (event) => {
+      // binary frames are chunks of a stream requested with {"action": "get_results"}
+      if (event.data instanceof ArrayBuffer) {
+        try {
+          const chunk = decodeResultChunk(event.data);
+          const pending = pendingStreams.current[chunk.stream_id];
+          if (pending) pending.chunks[chunk.index] = chunk;
+        } catch (err) {
+          console.error("Failed to decode result chunk:", err);
+        }
+        return;
+      }
+
       console.log("Raw WebSocket message received:", event.data);
 
       let msg;
@@ -28,12 +99,24 @@ export const WebSocketProvider = ({ children }) => {
       }
 
       console.log("Parsed WebSocket message:", msg);
-      setMessages((prev) => [...prev, msg]);
 
-      // optional: log process completion
-      if (msg.process_complete) {
-        console.log(`Process "${msg.process_name}" completed`);
+      // server heartbeat: answer, or the connection is closed as dead
+      if (msg.type === "ping") {
+        ws.current.send(JSON.stringify({ action: "pong" }));
+        return;
       }
+
+      // the server coalesces bursts of progress into "batch" frames
+      const batch = msg.type === "batch" ? msg.messages : [msg];
+      setMessages((prev) => [...prev, ...batch]);
+
+      // optional: log process completion
+      batch.forEach((m) => {
+        handleStreamMessage(m);
+        if (m.process_complete) {
+          console.log(`Process "${m.process_name}" completed`);
+        }
+      });
     };
 
     ws.current.onclose = (event) => {
@@ -66,6 +149,7 @@ export const WebSocketProvider = ({ children }) => {
         ws: ws.current,
         sendMessage,
         messages,
+        streams,
         isConnected,
       }}
     >
@@ -0,0 +1,86 @@
+// utils/resultStream.js
+
+// Binary result chunk frames (see backend/websockets/result_stream.py):
+// "MRC1" | uint32 header length (big-endian) | JSON header | padding | data
+// The data starts at a multiple of 8 bytes, so arrays can be viewed without copying.
+
+const MAGIC = "MRC1";
+
+export function decodeResultChunk(buffer) {
+  const bytes = new Uint8Array(buffer);
+  if (new TextDecoder().decode(bytes.subarray(0, 4)) !== MAGIC) {
+    throw new Error("Not a result chunk frame");
+  }
+
+  const headerLength = new DataView(buffer).getUint32(4, false);
+  const header = JSON.parse(new TextDecoder().decode(bytes.subarray(8, 8 + headerLength)));
+  const offset = 8 + headerLength;
+
+  return { ...header, buffer, offset };
+}
+
+// Turn a decoded chunk into its value using the manifest entry for its index:
+// the summary object for JSON chunks, a Float64Array (row-major, manifest shape) for arrays.
+export function readResultChunk(chunk, manifest) {
+  const entry = manifest.chunks[chunk.index];
+
+  if (entry.encoding === "json") {
+    const text = new TextDecoder().decode(new Uint8Array(chunk.buffer, chunk.offset));
+    return { ...entry, value: JSON.parse(text) };
+  }
+
+  return { ...entry, value: new Float64Array(chunk.buffer, chunk.offset) };
+}
+
+// Index of the first chunk not yet received, to resume with {"action": "get_results", from_chunk}
+export function nextChunkIndex(received, manifest) {
+  let i = 0;
+  while (i < manifest.chunks.length && received[i]) i += 1;
+  return i;
+}
+
+// Build the full payload once every chunk of a stream has arrived (chunks: {index: decoded chunk}).
+//   model_results: {summary, df_cost, df_qaly, correction, arrays: {treatment: {occupancy, costs, qalys}}}
+//     with each array one Float64Array, row-major in manifest.array_layout order
+//   model_bundle:  the bundle object (settings keys, parameters, transition_matrix_data, event_data)
+export function assembleStream(manifest, chunks) {
+  const parts = manifest.chunks.map((entry) => readResultChunk(chunks[entry.index], manifest));
+
+  if (manifest.kind === "model_bundle") {
+    const bundle = {};
+    Object.entries(manifest.list_sections || {}).forEach(([name, n]) => {
+      bundle[name] = new Array(n);
+    });
+    parts.forEach((part) => {
+      if (part.name === "settings") Object.assign(bundle, part.value);
+      else if (part.item !== undefined) bundle[part.name][part.item] = part.value;
+      else bundle[part.name] = part.value;
+    });
+    return bundle;
+  }
+
+  const out = { arrays: {} };
+  const sizes = {};
+  parts.forEach((part) => {
+    if (part.treatment === undefined) return;
+    const key = `${part.treatment}\u0000${part.name}`;
+    sizes[key] = (sizes[key] || 0) + part.value.length;
+  });
+
+  const filled = {};
+  parts.forEach((part) => {
+    if (part.treatment === undefined) {
+      out[part.name] = part.value;
+      return;
+    }
+    const key = `${part.treatment}\u0000${part.name}`;
+    const arrays = (out.arrays[part.treatment] ||= {});
+    if (!arrays[part.name]) {
+      arrays[part.name] = new Float64Array(sizes[key]);
+      filled[key] = 0;
+    }
+    arrays[part.name].set(part.value, filled[key]);
+    filled[key] += part.value.length;
+  });
+  return out;
+}